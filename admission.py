@@ -0,0 +1,266 @@
+# admission.py
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, jsonify, request
+
+import instrumentation
+
+try:
+    import redis
+except ImportError:  # optional: only needed for RATE_LIMIT_STORAGE_URL=redis://...
+    redis = None
+
+DEFAULTS = {
+    "RATE_LIMIT_ENABLED": True,
+    # Tokens added per second and bucket size, per client
+    "RATE_LIMIT_RATE": 10.0,
+    "RATE_LIMIT_BURST": 60.0,
+    # Number of reverse proxies in front of the app that append to X-Forwarded-For
+    "RATE_LIMIT_TRUSTED_PROXIES": 0,
+    # Requests costing at least this much also need one of HEAVY_CONCURRENCY slots
+    "HEAVY_COST": 5,
+    "HEAVY_QUEUE_SECONDS": 0.5,
+}
+
+
+class MemoryStore:
+    """Token buckets in process memory; each gunicorn worker keeps its own."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, cost, rate, burst):
+        """
+        Spend ``cost`` tokens from ``key``'s bucket.
+
+        Returns ``(wait, remaining)``: ``wait`` is 0 when the request may
+        proceed, otherwise the seconds until enough tokens have refilled.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            # The least recently seen clients go first; their buckets would be full again anyway
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait, tokens
+
+
+_TAKE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {tostring(wait), tostring(tokens)}
+"""
+
+
+class RedisStore:
+    """Token buckets shared by every process, updated atomically by a Lua script."""
+
+    def __init__(self, client, prefix="ratelimit:"):
+        self.prefix = prefix
+        self._take = client.register_script(_TAKE_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_STORAGE_URL needs the redis package")
+        return cls(redis.Redis.from_url(url))
+
+    def take(self, key, cost, rate, burst):
+        wait, tokens = self._take(keys=[self.prefix + key], args=[rate, burst, cost])
+        return float(wait), float(tokens)
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` holders at once; ``limit = 0`` admits everything."""
+
+    def __init__(self, limit=0):
+        self.configure(limit)
+
+    def configure(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._slots = threading.BoundedSemaphore(limit) if limit > 0 else None
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        """Wait up to ``timeout`` seconds for a slot; False if none freed up."""
+        if self._slots is None:
+            return True
+        if not self._slots.acquire(timeout=timeout):
+            return False
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    def release(self):
+        if self._slots is None:
+            return
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+
+heavy = ConcurrencyLimiter()
+# Event streams keep their thread for minutes, so they get their own, smaller cap
+streams = ConcurrencyLimiter()
+
+
+def cost(n):
+    """Charge ``n`` tokens per request to the decorated route instead of 1; 0 exempts it."""
+    def decorator(view):
+        view.rate_limit_cost = n
+        return view
+    return decorator
+
+
+def long_lived(view):
+    """Hold one of ``STREAM_CONCURRENCY`` slots for the decorated route's whole response."""
+    view.long_lived = True
+    return view
+
+
+def client_key():
+    """The client's address, read from X-Forwarded-For behind ``RATE_LIMIT_TRUSTED_PROXIES`` proxies."""
+    hops = current_app.config["RATE_LIMIT_TRUSTED_PROXIES"]
+    forwarded = request.headers.get("X-Forwarded-For")
+    if hops and forwarded:
+        # Each trusted proxy appended the address it saw; anything further left can be forged
+        chain = [part.strip() for part in forwarded.split(",")]
+        return chain[max(0, len(chain) - hops)]
+    return request.remote_addr or "unknown"
+
+
+_rejected = {"rate_limited": 0, "shed": 0}
+
+
+def admission_metrics():
+    return [
+        "# HELP http_rate_limited_total Requests refused with 429 by the per-client token bucket.",
+        "# TYPE http_rate_limited_total counter",
+        f"http_rate_limited_total {_rejected['rate_limited']}",
+        "# HELP http_shed_total Heavy requests and streams refused with 503 because every slot was busy.",
+        "# TYPE http_shed_total counter",
+        f"http_shed_total {_rejected['shed']}",
+        "# HELP http_heavy_in_flight Heavy requests currently running in this process.",
+        "# TYPE http_heavy_in_flight gauge",
+        f"http_heavy_in_flight {heavy.in_flight}",
+        "# HELP http_streams_in_flight Long-lived event streams currently open in this process.",
+        "# TYPE http_streams_in_flight gauge",
+        f"http_streams_in_flight {streams.in_flight}"
+    ]
+
+
+def _refuse(status, message, retry_after):
+    response = jsonify({"error": message})
+    response.status_code = status
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def _request_cost(app, overrides):
+    if request.endpoint in overrides:
+        return overrides[request.endpoint]
+    view = app.view_functions.get(request.endpoint)
+    return getattr(view, "rate_limit_cost", 1)
+
+
+def init_app(app):
+    """
+    Admit requests through a per-client token bucket and cap concurrent heavy requests.
+
+    Every request spends its route's cost (1 unless the view is decorated
+    with ``@cost(n)`` or listed in ``RATE_LIMIT_COSTS``) from the client's
+    bucket and gets a ``429`` once it is empty. Requests costing at least
+    ``HEAVY_COST`` also take one of ``HEAVY_CONCURRENCY`` per-process slots,
+    waiting up to ``HEAVY_QUEUE_SECONDS`` before being shed with a ``503``,
+    so exports and imports cannot tie up every worker thread. Views marked
+    ``@long_lived`` (event streams) take one of ``STREAM_CONCURRENCY`` slots
+    instead and are refused at once when none is free.
+    """
+    # Heavy requests each hold a connection; leave half the pool to everything else
+    pool_size = int(os.environ.get("DB_POOL_SIZE") or os.environ.get("GUNICORN_THREADS") or 8)
+    defaults = dict(DEFAULTS, HEAVY_CONCURRENCY=max(1, pool_size // 2), STREAM_CONCURRENCY=max(1, pool_size // 4))
+    if os.environ.get("RENDER") == "true":
+        # Render's load balancer appends the client address to X-Forwarded-For
+        defaults["RATE_LIMIT_TRUSTED_PROXIES"] = 1
+    for name, default in defaults.items():
+        value = os.environ.get(name)
+        if value is not None:
+            default = value.lower() in ("1", "true", "yes") if isinstance(default, bool) else type(default)(value)
+        app.config.setdefault(name, default)
+
+    store = app.config.get("RATE_LIMIT_STORE")
+    if store is None:
+        url = app.config.get("RATE_LIMIT_STORAGE_URL", os.environ.get("RATE_LIMIT_STORAGE_URL"))
+        store = RedisStore.from_url(url) if url else MemoryStore()
+    key_func = app.config.get("RATE_LIMIT_KEY", client_key)
+    # Scrapers poll /metrics often and must still get through during an overload
+    costs = {"metrics": 0, **app.config.get("RATE_LIMIT_COSTS", {})}
+    heavy.configure(app.config["HEAVY_CONCURRENCY"])
+    streams.configure(app.config["STREAM_CONCURRENCY"])
+    if admission_metrics not in instrumentation.collectors:
+        instrumentation.collectors.append(admission_metrics)
+
+    @app.before_request
+    def admit():
+        charge = _request_cost(app, costs)
+        if not charge:
+            return None
+        config = app.config
+        if config["RATE_LIMIT_ENABLED"]:
+            rate, burst = config["RATE_LIMIT_RATE"], config["RATE_LIMIT_BURST"]
+            wait, remaining = store.take(key_func(), min(charge, burst), rate, burst)
+            g.rate_limit_remaining = remaining
+            if wait:
+                _rejected["rate_limited"] += 1
+                return _refuse(429, "Too many requests, slow down", wait)
+
+        if getattr(app.view_functions.get(request.endpoint), "long_lived", False):
+            # Waiting would only hold yet another thread; EventSource retries by itself
+            if not streams.acquire(0):
+                _rejected["shed"] += 1
+                return _refuse(503, "Too many open streams, try again shortly", 5)
+            g.stream_slot = True
+        elif charge >= config["HEAVY_COST"]:
+            if not heavy.acquire(config["HEAVY_QUEUE_SECONDS"]):
+                _rejected["shed"] += 1
+                return _refuse(503, "Server is busy, try again shortly", 1)
+            g.heavy_slot = True
+        return None
+
+    @app.after_request
+    def rate_limit_headers(response):
+        if "rate_limit_remaining" in g:
+            response.headers["RateLimit-Limit"] = str(int(app.config["RATE_LIMIT_BURST"]))
+            response.headers["RateLimit-Remaining"] = str(int(g.rate_limit_remaining))
+        return response
+
+    @app.teardown_request
+    def release_slot(error=None):
+        # Streamed responses tear down only after their last chunk, so exports hold the slot throughout
+        if g.pop("heavy_slot", False):
+            heavy.release()
+        if g.pop("stream_slot", False):
+            streams.release()
@@ -0,0 +1,198 @@
+# aggregates.py
+import time
+from datetime import timezone
+
+from sqlalchemy import bindparam, case, func, insert, select
+
+from database import db
+import replicas
+
+
+class Counter(db.Model):
+    """A denormalized running total, e.g. ``books.total`` or ``tasks.completed``."""
+    __tablename__ = 'counters'
+
+    name = db.Column(db.String(150), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# Models opt in by defining two hooks:
+#   counts(row) -> {counter: delta} contributed by one row (a ``snapshot`` dict)
+#   recount()   -> {counter: value} recomputed from the table in one grouped query
+# Counter names are stored prefixed with the table name.
+#
+# They may also declare ``TALLIES = [(summary_model, column, count_column)]``:
+# a summary table holding one row per distinct ``column`` value with its row
+# count in ``count_column``, maintained by the same write paths.
+#
+# Every write path also bumps ``version.<table>``, which conditional.py turns
+# into ETag and Last-Modified headers.
+
+
+def snapshot(obj):
+    """Copy the column values of ``obj`` so they survive later attribute changes."""
+    return {col.key: getattr(obj, col.key) for col in obj.__table__.columns}
+
+
+def _prefixed(model, values):
+    return {f"{model.__tablename__}.{name}": value for name, value in values.items()}
+
+
+def _store_totals(model):
+    # Counters built from a lagging replica would stay off by the missed writes for good
+    replicas.use_primary()
+    totals = _prefixed(model, model.recount())
+    Counter.query.filter(Counter.name.like(f"{model.__tablename__}.%")).delete(
+        synchronize_session=False
+    )
+    db.session.add_all([Counter(name=name, value=value) for name, value in totals.items()])
+    for summary, column, count_column in getattr(model, "TALLIES", ()):
+        table = summary.__table__
+        db.session.execute(table.delete())
+        db.session.execute(insert(table).from_select(
+            [column, count_column],
+            select(getattr(model, column), func.count()).group_by(getattr(model, column))
+        ))
+    return totals
+
+
+def _upsert(table):
+    """An INSERT that adds to the count of an existing key, where the dialect has one."""
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(table)
+
+
+def _track_tally(summary, column, count_column, delta):
+    """Apply ``{value: change}`` to a summary table in a few statements, however many values changed."""
+    table = summary.__table__
+    key, count = table.c[column], table.c[count_column]
+    params = [{"k": k, "d": d} for k, d in delta.items()]
+    updates = [p for p in params if p["d"] < 0]
+    inserts = [p for p in params if p["d"] > 0]
+
+    upsert = _upsert(table) if inserts else None
+    if upsert is not None:
+        upsert = upsert.values({column: bindparam("k"), count_column: bindparam("d")})
+        db.session.execute(upsert.on_conflict_do_update(
+            index_elements=[key], set_={count_column: count + upsert.excluded[count_column]}
+        ), inserts)
+    elif inserts:
+        existing = set(db.session.scalars(select(key).where(key.in_([p["k"] for p in inserts]))))
+        updates += [p for p in inserts if p["k"] in existing]
+        inserts = [{column: p["k"], count_column: p["d"]} for p in inserts if p["k"] not in existing]
+        if inserts:
+            db.session.execute(insert(table), inserts)
+
+    if updates:
+        db.session.execute(
+            table.update().where(key == bindparam("k")).values({count_column: count + bindparam("d")}),
+            updates
+        )
+        # Values no row has any more drop out of the summary
+        shrunk = [p["k"] for p in updates if p["d"] < 0]
+        if shrunk:
+            db.session.execute(table.delete().where(key.in_(shrunk), count <= 0))
+
+
+def refresh(model):
+    """Recompute every counter of ``model`` from the table; used after bulk statements."""
+    totals = _store_totals(model)
+    bump_version(model)
+    return totals
+
+
+def track(model, before=None, after=None):
+    """Apply the counter change for one row being inserted, updated or deleted."""
+    track_rows(model, [before] if before else [], [after] if after else [])
+
+
+def track_rows(model, before=(), after=()):
+    """
+    Apply the net counter change of replacing ``before`` rows with ``after`` rows.
+
+    Runs inside the caller's transaction and issues one statement per
+    affected counter, however many rows changed, plus a few per tally.
+    Counters that have never been built, by migration 0008 or ``refresh``,
+    are left alone.
+    """
+    delta = {}
+    for rows, sign in ((before, -1), (after, 1)):
+        for row in rows:
+            for name, value in model.counts(row).items():
+                delta[name] = delta.get(name, 0) + sign * value
+
+    if before or after:
+        bump_version(model)
+        # Tallies are built with their tables (migration 0006, ``refresh``), so they are always kept
+        for summary, column, count_column in getattr(model, "TALLIES", ()):
+            changes = {}
+            for rows, sign in ((before, -1), (after, 1)):
+                for row in rows:
+                    changes[row[column]] = changes.get(row[column], 0) + sign
+            changes = {value: n for value, n in changes.items() if n}
+            if changes:
+                _track_tally(summary, column, count_column, changes)
+
+    initialized = None
+    for name, value in _prefixed(model, delta).items():
+        if not value:
+            continue
+        updated = Counter.query.filter_by(name=name).update(
+            {Counter.value: Counter.value + value}, synchronize_session=False
+        )
+        if updated:
+            continue
+        # A new key (e.g. a first book with a new status) under an initialized model
+        if initialized is None:
+            initialized = db.session.get(Counter, f"{model.__tablename__}.total") is not None
+        if initialized:
+            db.session.add(Counter(name=name, value=value))
+
+
+def totals(model):
+    """Return ``{counter: value}`` for ``model`` without the table prefix."""
+    prefix = f"{model.__tablename__}."
+    rows = Counter.query.filter(Counter.name.like(f"{prefix}%")).all()
+    if not any(row.name == f"{prefix}total" for row in rows):
+        # Not built yet (see migration 0008): count the rows without storing anything
+        values = _prefixed(model, model.recount())
+    else:
+        values = {row.name: row.value for row in rows}
+    return {name[len(prefix):]: value for name, value in values.items()}
+
+
+def bump_version(model):
+    """
+    Advance the version of ``model``'s table inside the caller's transaction.
+
+    The version is a millisecond timestamp that only ever increases, so it
+    doubles as the table's last-modified time.
+    """
+    name = f"version.{model.__tablename__}"
+    now = int(time.time() * 1000)
+    updated = Counter.query.filter_by(name=name).update(
+        {Counter.value: case((Counter.value >= now, Counter.value + 1), else_=now)},
+        synchronize_session=False
+    )
+    if not updated:
+        db.session.add(Counter(name=name, value=now))
+
+
+def versions(*models):
+    """Return the current version of each model's table, in order, with one query."""
+    names = [f"version.{model.__tablename__}" for model in models]
+    stored = dict(db.session.query(Counter.name, Counter.value).filter(Counter.name.in_(names)).all())
+    result = []
+    for name, model in zip(names, models):
+        if name not in stored:
+            # Not written through the app since the column was added; fall back to the rows
+            latest = db.session.query(func.max(model.updated_at)).scalar()
+            stored[name] = int(latest.replace(tzinfo=timezone.utc).timestamp() * 1000) if latest else 0
+        result.append(stored[name])
+    return result
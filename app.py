@@ -1,6 +1,16 @@
 import os
 from flask import Flask
-from database import db
+from database import db, init_migrate
+import admission
+import cache
+import changes
+import compression
+import fastjson
+import instrumentation
+import jobs
+import pooling
+import replicas
+from seed import seed_command
 from bookify.routes import bookify_bp
 from taskflow.routes import taskflow_bp
 from notenest.routes import notenest_bp
@@ -17,8 +27,27 @@ def create_app():
 
     app.config["SQLALCHEMY_DATABASE_URI"] = db_url
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = pooling.engine_options(db_url)
+    # Optional read replicas, e.g. DATABASE_REPLICA_URLS=postgresql://replica-1/...,postgresql://replica-2/...
+    app.config["SQLALCHEMY_BINDS"] = replicas.binds(replicas.replica_urls(), pooling.engine_options)
 
     db.init_app(app)
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        # Set by the flask command: `flask db ...` and `flask seed` need migrations
+        init_migrate(app)
+    cache.init_app(app)
+    # Before instrumentation, which wraps the provider's dumps to time serialization
+    app.json = fastjson.provider(app)
+    instrumentation.init_app(app)
+    pooling.init_app(app)
+    replicas.init_app(app)
+    jobs.init_app(app)
+    changes.init_app(app)
+    # After instrumentation, so refused requests still show up in its timings
+    admission.init_app(app)
+    # Registered last so it runs first among after_request hooks and its time is in Server-Timing
+    compression.init_app(app)
+    app.cli.add_command(seed_command)
 
     # Register blueprints
     app.register_blueprint(bookify_bp, url_prefix="/bookify")
@@ -35,12 +64,7 @@ def create_app():
     return app
 
 
-# ✅ Expose app for Gunicorn
-app = create_app()
-
-# ✅ Create tables automatically on startup (lightweight apps)
-with app.app_context():
-    db.create_all()
-
+# Importing this module builds nothing: gunicorn calls `app:create_app()`, `flask --app app`
+# finds the factory, and the schema is managed by `flask db upgrade`
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,13 @@
+# asgi.py
+#
+# ASGI entry point for servers such as uvicorn or hypercorn:
+#   uvicorn --factory asgi:create_application
+#   GUNICORN_PROFILE=asgi gunicorn -c gunicorn.conf.py
+# Each request still runs the Flask app synchronously, on asgiref's thread pool.
+from asgiref.wsgi import WsgiToAsgi
+
+from app import create_app
+
+
+def create_application():
+    return WsgiToAsgi(create_app())
@@ -0,0 +1,117 @@
+# batch.py
+from flask import jsonify
+from sqlalchemy import delete, insert, update
+
+import aggregates
+from cache import row_cache
+from database import db
+from pagination import bad_request
+
+MAX_BATCH_SIZE = 1000
+
+# Each blueprint supplies a validator: validate(item, partial=False) -> (fields, error).
+# With partial=False it must return every insertable column (defaults filled in) so
+# all rows share the same keys and can go out as one executemany.
+
+
+def _items(payload):
+    if not isinstance(payload, list) or not payload:
+        bad_request("Expected a non-empty JSON array")
+    if len(payload) > MAX_BATCH_SIZE:
+        bad_request(f"A batch may contain at most {MAX_BATCH_SIZE} items")
+    return payload
+
+
+def _ids(values):
+    if not isinstance(values, list) or not values:
+        bad_request("Expected a non-empty 'ids' array")
+    if len(values) > MAX_BATCH_SIZE:
+        bad_request(f"A batch may contain at most {MAX_BATCH_SIZE} items")
+    if not all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        bad_request("ids must be integers")
+    return list(dict.fromkeys(values))
+
+
+def _load(model, ids):
+    """Snapshot the existing rows among ``ids`` with one IN query."""
+    rows = model.query.filter(model.id.in_(ids)).all()
+    return {row.id: aggregates.snapshot(row) for row in rows}
+
+
+def create(model, payload, validate):
+    """Validate every item, then insert them all with a single executemany."""
+    rows, errors = [], []
+    for index, item in enumerate(_items(payload)):
+        fields, error = validate(item) if isinstance(item, dict) else (None, "Expected a JSON object")
+        if error:
+            errors.append({"index": index, "error": error})
+        else:
+            rows.append(fields)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    ids = db.session.scalars(
+        insert(model).returning(model.id, sort_by_parameter_order=True), rows
+    ).all()
+    aggregates.track_rows(model, after=rows)
+    db.session.commit()
+    return jsonify({
+        "created": len(ids),
+        "results": [{"index": index, "id": row_id} for index, row_id in enumerate(ids)]
+    }), 201
+
+
+def update_many(model, payload, validate):
+    """Apply partial updates keyed by ``id``; unknown ids are reported per item."""
+    changes, errors = {}, []
+    for index, item in enumerate(_items(payload)):
+        if not isinstance(item, dict) or not isinstance(item.get("id"), int):
+            errors.append({"index": index, "error": "Each item needs an integer 'id'"})
+            continue
+        fields, error = validate({k: v for k, v in item.items() if k != "id"}, partial=True)
+        if error:
+            errors.append({"index": index, "error": error})
+        elif item["id"] in changes:
+            errors.append({"index": index, "error": f"Duplicate id {item['id']}"})
+        else:
+            changes[item["id"]] = fields
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    before = _load(model, list(changes))
+    results, params, after = [], [], []
+    for index, (row_id, fields) in enumerate(changes.items()):
+        if row_id not in before:
+            results.append({"index": index, "id": row_id, "error": "not found"})
+            continue
+        results.append({"index": index, "id": row_id, "updated": bool(fields)})
+        if fields:
+            params.append({"id": row_id, **fields})
+            after.append({**before[row_id], **fields})
+
+    if params:
+        db.session.execute(update(model), params)
+        aggregates.track_rows(model, [before[p["id"]] for p in params], after)
+    db.session.commit()
+    for p in params:
+        row_cache.invalidate(model, p["id"])
+    return jsonify({"updated": len(params), "results": results})
+
+
+def delete_many(model, payload):
+    """Delete the rows named in ``{"ids": [...]}`` with one statement."""
+    ids = _ids((payload or {}).get("ids") if isinstance(payload, dict) else None)
+    before = _load(model, ids)
+    if before:
+        db.session.execute(delete(model).where(model.id.in_(list(before))))
+        aggregates.track_rows(model, before=list(before.values()))
+    db.session.commit()
+    for row_id in before:
+        row_cache.invalidate(model, row_id)
+    return jsonify({
+        "deleted": len(before),
+        "results": [
+            {"id": row_id, "deleted": True} if row_id in before else {"id": row_id, "error": "not found"}
+            for row_id in ids
+        ]
+    })
@@ -0,0 +1 @@
+"""HTTP benchmarks for every blueprint route; run with ``python -m benchmarks``."""
@@ -0,0 +1,112 @@
+# benchmarks/__main__.py
+import argparse
+import json
+import sys
+
+from .contention import PROFILES as SQLITE_PROFILES, contend
+from .harness import run, compare
+from .scenarios import MIN_SIZE
+from .serving import PROFILES, serve
+from .startup import measure_startup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Benchmark every route and write a JSON report.")
+    run_parser.add_argument("--sizes", default="1000,10000",
+                            help="Comma-separated rows per table (default: 1000,10000).")
+    run_parser.add_argument("--requests", type=int, default=50, help="Requests per route.")
+    run_parser.add_argument("--concurrency", type=int, default=8,
+                            help="Threads for the read-route throughput pass.")
+    run_parser.add_argument("--database-url",
+                            help="Benchmark this database (it is wiped!) instead of a temporary SQLite file.")
+    run_parser.add_argument("--workers", type=int, default=1, help="Seeding processes.")
+    run_parser.add_argument("--only", help="Only run endpoints containing this text.")
+    run_parser.add_argument("--startup-runs", type=int, default=5,
+                            help="Fresh interpreters timed for cold startup; 0 skips it (default: 5).")
+    run_parser.add_argument("--output", default="bench_output.json", help="Report path.")
+
+    startup_parser = commands.add_parser(
+        "startup", help="Time importing the app, create_app() and the first request in fresh interpreters.")
+    startup_parser.add_argument("--runs", type=int, default=5, help="Interpreters to start (median is reported).")
+    startup_parser.add_argument("--database-url",
+                                help="Point the app at this database instead of a temporary SQLite file.")
+
+    serve_parser = commands.add_parser(
+        "serve", help="Load-test real gunicorn servers, one per serving profile.")
+    serve_parser.add_argument("--profiles", default=",".join(PROFILES),
+                              help=f"Comma-separated GUNICORN_PROFILE values (default: {','.join(PROFILES)}).")
+    serve_parser.add_argument("--clients", type=int, default=100, help="Concurrent keep-alive connections.")
+    serve_parser.add_argument("--duration", type=float, default=15, help="Seconds per profile.")
+    serve_parser.add_argument("--size", type=int, default=10000, help="Rows per table.")
+    serve_parser.add_argument("--database-url",
+                              help="Benchmark this database (it is wiped!) instead of a temporary SQLite file.")
+    serve_parser.add_argument("--output", default="bench_serving.json", help="Report path.")
+
+    contention_parser = commands.add_parser(
+        "contention", help="Compare SQLite profiles under mixed read/write load from several processes.")
+    contention_parser.add_argument("--profiles", default=",".join(SQLITE_PROFILES),
+                                   help=f"Comma-separated profiles (default: {','.join(SQLITE_PROFILES)}).")
+    contention_parser.add_argument("--processes", type=int, default=4, help="Worker processes.")
+    contention_parser.add_argument("--threads", type=int, default=4, help="Client threads per process.")
+    contention_parser.add_argument("--duration", type=float, default=10, help="Seconds per profile.")
+    contention_parser.add_argument("--size", type=int, default=10000, help="Rows per table.")
+    contention_parser.add_argument("--write-ratio", type=float, default=0.2,
+                                   help="Share of requests that write (default: 0.2).")
+    contention_parser.add_argument("--output", default="bench_contention.json", help="Report path.")
+
+    compare_parser = commands.add_parser("compare", help="Diff two reports.")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="Percent change flagged as a regression (default: 10).")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        sizes = [int(size) for size in args.sizes.split(",")]
+        if min(sizes) < MIN_SIZE:
+            parser.error(f"--sizes must be at least {MIN_SIZE} rows per table")
+        report = run(sizes, args.requests, args.concurrency, args.database_url, args.workers, args.only,
+                     0 if args.only else args.startup_runs)
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"📄 Wrote {args.output}")
+        return 0
+
+    if args.command == "serve":
+        report = serve(args.profiles.split(","), args.clients, args.duration, args.size, args.database_url)
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"📄 Wrote {args.output}")
+        return 0
+
+    if args.command == "startup":
+        measure_startup(args.database_url, args.runs)
+        return 0
+
+    if args.command == "contention":
+        report = contend(args.processes, args.threads, args.duration, args.size, args.write_ratio,
+                         args.profiles.split(","))
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"📄 Wrote {args.output}")
+        return 0
+
+    with open(args.base) as fh:
+        base = json.load(fh)
+    with open(args.head) as fh:
+        head = json.load(fh)
+    regressions = 0
+    for size, endpoint, metric, old, new, change, worse in compare(base, head, args.threshold):
+        marker = "❌" if worse else "  "
+        regressions += worse
+        print(f"{marker} {size:>8} {endpoint:<40} {metric:<8} {old:>10} → {new:<10} {change:+7.1f}%")
+    print(f"{regressions} regression(s) above {args.threshold}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# benchmarks/contention.py
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .harness import build_app, percentile, _git_commit
+
+# Environment for each SQLite profile; "stock" is SQLite's rollback journal with default settings
+PROFILES = {
+    "stock": {"SQLITE_TUNING": "false"},
+    "tuned": {"SQLITE_TUNING": "true"},
+}
+
+READS = (
+    lambda rng, size: f"/bookify/books?limit=20&after={_cursor(rng.randint(1, size))}",
+    lambda rng, size: "/taskflow/tasks/search?q=a&limit=20",
+    lambda rng, size: "/bookify/books/stats",
+)
+WRITES = (
+    lambda client, rng, size: client.put(f"/taskflow/tasks/{rng.randint(1, size)}/toggle"),
+    lambda client, rng, size: client.put(f"/bookify/books/{rng.randint(1, size)}", json={"status": "Reading"}),
+    lambda client, rng, size: client.post("/notenest/notes", json={"title": "bench", "content": "contention test"}),
+)
+
+
+def _cursor(value):
+    from pagination import encode_cursor
+    return encode_cursor([value])
+
+
+def _copy(source_path, target_path, journal_mode=None):
+    source, target = sqlite3.connect(source_path), sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+        if journal_mode:
+            target.execute(f"PRAGMA journal_mode={journal_mode}")
+    finally:
+        source.close()
+        target.close()
+
+
+def _worker(env, size, threads, duration, write_ratio, seed, results):
+    """One process standing in for a gunicorn worker: ``threads`` clients on its own app."""
+    os.environ.update(env)
+    from app import create_app
+
+    app = create_app()
+    app.logger.disabled = True  # failures are counted as 500s; their tracebacks would drown the report
+    samples = {"read": [], "write": []}
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client_loop(n):
+        rng = random.Random(seed * 100 + n)
+        client = app.test_client()
+        local = {"read": [], "write": []}
+        codes = {}
+        while time.perf_counter() < deadline:
+            kind = "write" if rng.random() < write_ratio else "read"
+            started = time.perf_counter()
+            if kind == "write":
+                response = rng.choice(WRITES)(client, rng, size)
+            else:
+                response = client.get(rng.choice(READS)(rng, size))
+            response.get_data()
+            local[kind].append(time.perf_counter() - started)
+            codes[response.status_code] = codes.get(response.status_code, 0) + 1
+        with lock:
+            for kind, values in local.items():
+                samples[kind].extend(values)
+            for code, n in codes.items():
+                statuses[code] = statuses.get(code, 0) + n
+
+    pool = [threading.Thread(target=client_loop, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((samples, statuses))
+
+
+def _summary(latencies, duration):
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / duration, 1),
+        "p50_ms": round((percentile(latencies, 50) or 0) * 1000, 3),
+        "p99_ms": round((percentile(latencies, 99) or 0) * 1000, 3),
+    }
+
+
+def contend(processes=4, threads=4, duration=10, size=10000, write_ratio=0.2, profiles=tuple(PROFILES), log=print):
+    """
+    Compare SQLite profiles under mixed read/write load from several processes.
+
+    Each process opens the same database file, like gunicorn workers would,
+    and runs ``threads`` clients sending writes with probability ``write_ratio``.
+    Failed requests (mostly ``database is locked``) show up as 500s.
+    """
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlite": sqlite3.sqlite_version,
+            "cpus": os.cpu_count(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "processes": processes,
+            "threads": threads,
+            "duration_s": duration,
+            "size": size,
+            "write_ratio": write_ratio
+        },
+        "profiles": {}
+    }
+    spawn = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "contention.db")
+        log(f"⏱  Seeding {size} rows per table...")
+        app = build_app(f"sqlite:///{path}", size)
+        with app.app_context():
+            from database import db
+            db.engine.dispose()
+        seeded = os.path.join(tmp, "seeded.db")
+        _copy(path, seeded)
+
+        for profile in profiles:
+            # Every profile starts from the same rows in the default journal mode
+            _copy(seeded, path, journal_mode="DELETE")
+            env = dict(PROFILES[profile], DATABASE_URL=f"sqlite:///{path}")
+            results = spawn.Queue()
+            workers = [
+                spawn.Process(target=_worker, args=(env, size, threads, duration, write_ratio, i, results))
+                for i in range(processes)
+            ]
+            for proc in workers:
+                proc.start()
+            samples, statuses = {"read": [], "write": []}, {}
+            for _ in workers:
+                part, codes = results.get()
+                for kind, values in part.items():
+                    samples[kind].extend(values)
+                for code, n in codes.items():
+                    statuses[code] = statuses.get(code, 0) + n
+            for proc in workers:
+                proc.join()
+
+            result = {
+                "reads": _summary(samples["read"], duration),
+                "writes": _summary(samples["write"], duration),
+                "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+                "errors": sum(n for code, n in statuses.items() if code >= 500)
+            }
+            report["profiles"][profile] = result
+            log(f"   {profile:<6} reads {result['reads']['throughput_rps']:>8.1f}/s "
+                f"p99 {result['reads']['p99_ms']:>8.2f} ms  "
+                f"writes {result['writes']['throughput_rps']:>7.1f}/s "
+                f"p99 {result['writes']['p99_ms']:>8.2f} ms  errors {result['errors']}")
+
+    return report
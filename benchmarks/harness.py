@@ -0,0 +1,260 @@
+# benchmarks/harness.py
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+
+from .startup import PHASES as STARTUP_PHASES, measure_startup
+from .scenarios import SCENARIOS, PHASES, READ, DESTRUCTIVE, BULK, DELETE_ROUND, Context
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class QueryCounter:
+    """Counts statements sent to an engine, across threads."""
+
+    def __init__(self, engine):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+def _resolve(value, ctx):
+    return value(ctx) if callable(value) else value
+
+
+def _send(client, spec, ctx):
+    path = _resolve(spec["path"], ctx)
+    body = _resolve(spec["body"], ctx)
+    kwargs = {}
+    if isinstance(body, str):
+        kwargs = {"data": body, "content_type": spec["content_type"]}
+    elif body is not None:
+        kwargs = {"json": body}
+    started = time.perf_counter()
+    response = client.open(path, method=spec["method"], **kwargs)
+    size = len(response.get_data())  # drains streamed bodies too
+    elapsed = time.perf_counter() - started
+    response.close()
+    return elapsed, response.status_code, size
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_app(database_url, size, workers=1):
+    """Create an app on ``database_url`` holding ``size`` rows per table."""
+    os.environ["DATABASE_URL"] = database_url
+    # Measure the routes themselves; one test client would otherwise be throttled at once
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["HEAVY_CONCURRENCY"] = "0"
+    os.environ["STREAM_CONCURRENCY"] = "0"
+    # Event streams answer after a single poll instead of staying open for minutes
+    os.environ["CHANGES_STREAM_SECONDS"] = "0"
+    from app import create_app
+    from database import db
+    from changes import create_change_triggers
+    from search import create_search_indexes
+    from seed import seed_model
+    from bookify.models import Book
+    from taskflow.models import Task
+    from notenest.models import Note
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for model in (Book, Task, Note):
+            seed_model(model, size, workers=workers)
+        create_search_indexes()
+        create_change_triggers()
+    return app
+
+
+def wait_for_jobs(app, timeout=600):
+    """Block until background jobs started by BULK scenarios finish; returns seconds waited."""
+    from database import db
+    from jobs import Job, QUEUED, RUNNING
+
+    started = time.perf_counter()
+    with app.app_context():
+        while time.perf_counter() - started < timeout:
+            pending = Job.query.filter(Job.status.in_((QUEUED, RUNNING))).count()
+            db.session.commit()  # end the read so the next poll sees new commits
+            if not pending:
+                break
+            time.sleep(0.1)
+    return time.perf_counter() - started
+
+
+def measure(app, spec, ctx, requests, concurrency, counter):
+    """Drive one scenario and summarize its latency, throughput and query count."""
+    client = app.test_client()
+    if spec["phase"] == BULK:
+        iterations = 1
+    elif spec["phase"] == DESTRUCTIVE:
+        # Single and batch deletes share the reserved ids
+        iterations = min(requests, ctx.reserved // DELETE_ROUND)
+    else:
+        iterations = requests
+
+    if spec["phase"] == READ:
+        for _ in range(3):  # warm caches and the connection pool
+            _send(client, spec, ctx)
+
+    latencies, statuses, sizes, peak = [], {}, [], None
+    queries_before = counter.count
+    for i in range(iterations):
+        # The first request runs under tracemalloc for the route's own peak allocation;
+        # tracing slows it down, so its latency is left out
+        traced = i == 0 and iterations > 1
+        if traced:
+            tracemalloc.start()
+        elapsed, status, size = _send(client, spec, ctx)
+        if traced:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            latencies.append(elapsed)
+        sizes.append(size)
+        statuses[status] = statuses.get(status, 0) + 1
+    queries = (counter.count - queries_before) / iterations
+
+    throughput = None
+    if spec["phase"] == READ and concurrency > 1:
+        def worker(seed):
+            local_client = app.test_client()
+            local_ctx = Context(random.Random(seed), ctx.size, ctx.words, ctx.names)
+            for _ in range(max(1, requests // concurrency)):
+                _send(local_client, spec, local_ctx)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+        wall = time.perf_counter() - started
+        throughput = round(max(1, requests // concurrency) * concurrency / wall, 1)
+
+    return {
+        "phase": spec["phase"],
+        "requests": iterations,
+        "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+        "errors": sum(n for code, n in statuses.items() if code >= 500),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3),
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(max(latencies) * 1000, 3)
+        },
+        "throughput_rps": throughput or round(iterations / sum(latencies), 1),
+        "concurrency": concurrency if throughput else 1,
+        "queries_per_request": round(queries, 2),
+        "response_bytes": round(sum(sizes) / len(sizes)),
+        "peak_alloc_kb": round(peak / 1024) if peak is not None else None
+    }
+
+
+def run(sizes, requests=50, concurrency=8, database_url=None, workers=1, only=None, startup_runs=5, log=print):
+    """Benchmark every scenario at each dataset size, then cold startup, and return the report dict."""
+    from seed import _pool
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "requests": requests,
+            "concurrency": concurrency,
+            "database": "custom" if database_url else "sqlite"
+        },
+        "sizes": {}
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            url = database_url or f"sqlite:///{os.path.join(tmp, f'bench-{size}.db')}"
+            log(f"⏱  Dataset size {size}: seeding...")
+            app = build_app(url, size, workers)
+            with app.app_context():
+                from database import db
+                counter = QueryCounter(db.engine)
+
+            ctx = Context(random.Random(size), size, _pool("words"), _pool("names"))
+            results = {}
+            for phase in PHASES:
+                for spec in SCENARIOS:
+                    if spec["phase"] != phase or (only and only not in spec["endpoint"]):
+                        continue
+                    results[spec["endpoint"]] = measure(app, spec, ctx, requests, concurrency, counter)
+                    latency = results[spec["endpoint"]]["latency_ms"]
+                    log(f"   {spec['endpoint']:<40} p50 {latency['p50']:>9.2f} ms  p99 {latency['p99']:>9.2f} ms")
+
+            waited = wait_for_jobs(app)
+            if waited >= 0.1:
+                log(f"   background jobs finished {waited:.1f}s after the last request")
+
+            covered = {spec["endpoint"] for spec in SCENARIOS}
+            missing = sorted(
+                rule.endpoint for rule in app.url_map.iter_rules()
+                if rule.endpoint not in covered and rule.endpoint != "static"
+            )
+            if missing and not only:
+                log(f"⚠️  Routes without a scenario: {', '.join(missing)}")
+            report["sizes"][str(size)] = results
+
+    if startup_runs:
+        log(f"⏱  Cold startup, median of {startup_runs} runs...")
+        report["startup"] = measure_startup(database_url, startup_runs, log)
+    return report
+
+
+def compare(base, head, threshold=10.0):
+    """Yield ``(size, endpoint, metric, before, after, change_pct, regressed)`` rows."""
+    metrics = (
+        ("p50", lambda r: r["latency_ms"]["p50"], True),
+        ("p95", lambda r: r["latency_ms"]["p95"], True),
+        ("p99", lambda r: r["latency_ms"]["p99"], True),
+        ("rps", lambda r: r["throughput_rps"], False),
+        ("queries", lambda r: r["queries_per_request"], True),
+    )
+    if base.get("startup") and head.get("startup"):
+        for phase in STARTUP_PHASES:
+            old, new = base["startup"][phase], head["startup"][phase]
+            change = (new - old) / old * 100 if old else 0.0
+            yield "startup", phase, "ms", old, new, change, change > threshold
+    for size, results in head["sizes"].items():
+        for endpoint, after in results.items():
+            before = base["sizes"].get(size, {}).get(endpoint)
+            if before is None:
+                continue
+            for name, get, lower_is_better in metrics:
+                old, new = get(before), get(after)
+                change = (new - old) / old * 100 if old else 0.0
+                worse = change > threshold if lower_is_better else change < -threshold
+                yield size, endpoint, name, old, new, change, worse
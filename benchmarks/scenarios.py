@@ -0,0 +1,165 @@
+# benchmarks/scenarios.py
+import json
+
+# Phases run in this order; table-wide BULK operations run once, at the very end
+READ, WRITE, DESTRUCTIVE, BULK = "read", "write", "destructive", "bulk"
+PHASES = (READ, WRITE, DESTRUCTIVE, BULK)
+
+# Rows at the top of each table that only deleting scenarios may touch,
+# so reads and updates never race a delete for the same id; half the table at most
+RESERVED = 500
+# Reserved ids one round of the delete scenarios takes: one single delete, a batch of 20
+DELETE_ROUND = 25
+# Smallest table that leaves one round of reserved ids and as many for the other scenarios
+MIN_SIZE = 2 * DELETE_ROUND
+
+
+class Context:
+    """Per-run state the scenarios draw ids, words and names from."""
+
+    def __init__(self, rng, size, words, names):
+        self.rng = rng
+        self.size = size
+        self.words = words
+        self.names = names
+        self.reserved = min(RESERVED, size // 2)
+        self._reserved = {}
+
+    def any_id(self):
+        return self.rng.randint(1, max(1, self.size - self.reserved))
+
+    def any_ids(self, n):
+        population = range(1, max(1, self.size - self.reserved) + 1)
+        return self.rng.sample(population, min(n, len(population)))
+
+    def reserved_id(self, table):
+        ids = self._reserved.setdefault(table, list(range(self.size, self.size - self.reserved, -1)))
+        return ids.pop() if ids else self.size
+
+    def reserved_ids(self, table, n):
+        return [self.reserved_id(table) for _ in range(n)]
+
+    def word(self):
+        return self.rng.choice(self.words)
+
+    def name(self):
+        return self.rng.choice(self.names)
+
+
+def scenario(endpoint, method, path, body=None, phase=READ, content_type=None):
+    """``path`` and ``body`` may be callables taking a ``Context``."""
+    return {
+        "endpoint": endpoint, "method": method, "path": path,
+        "body": body, "phase": phase, "content_type": content_type
+    }
+
+
+def _ndjson(rows):
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+SCENARIOS = [
+    scenario("home", "GET", "/"),
+    scenario("cache_stats", "GET", "/cache/stats"),
+    scenario("metrics", "GET", "/metrics"),
+    scenario("get_job", "GET", "/jobs/unknown"),
+    scenario("cancel_job", "DELETE", "/jobs/unknown", phase=WRITE),
+
+    # --- Bookify ---
+    scenario("bookify.home", "GET", "/bookify/"),
+    scenario("bookify.get_books", "GET", "/bookify/books"),
+    scenario("bookify.get_book", "GET", lambda c: f"/bookify/books/{c.any_id()}"),
+    scenario("bookify.search_books", "GET", lambda c: f"/bookify/books/search?q={c.word()}"),
+    scenario("bookify.books_by_author", "GET", lambda c: f"/bookify/books/author/{c.name()}"),
+    scenario("bookify.books_by_status", "GET", "/bookify/books/status/Reading"),
+    scenario("bookify.book_stats", "GET", "/bookify/books/stats"),
+    scenario("bookify.random_book", "GET", "/bookify/books/random"),
+    scenario("bookify.top_authors", "GET", "/bookify/books/top-authors"),
+    scenario("bookify.export_books", "GET", "/bookify/books/export"),
+    scenario("bookify.book_changes", "GET", "/bookify/changes?since=0"),
+    scenario("bookify.add_book", "POST", "/bookify/books",
+             lambda c: {"title": c.word(), "author": c.name()}, WRITE),
+    scenario("bookify.update_book", "PUT", lambda c: f"/bookify/books/{c.any_id()}",
+             {"status": "Reading"}, WRITE),
+    scenario("bookify.add_books_batch", "POST", "/bookify/books/batch",
+             lambda c: [{"title": c.word(), "author": c.name()} for _ in range(50)], WRITE),
+    scenario("bookify.update_books_batch", "PATCH", "/bookify/books/batch",
+             lambda c: [{"id": i, "status": "Read"} for i in c.any_ids(50)], WRITE),
+    scenario("bookify.import_books", "POST", "/bookify/books/import",
+             lambda c: _ndjson({"title": c.word(), "author": c.name()} for _ in range(100)),
+             WRITE, "application/x-ndjson"),
+    scenario("bookify.mark_author_books_read", "PUT",
+             lambda c: f"/bookify/books/author/{c.name()}/mark_read", phase=WRITE),
+    scenario("bookify.delete_book", "DELETE", lambda c: f"/bookify/books/{c.reserved_id('books')}",
+             phase=DESTRUCTIVE),
+    scenario("bookify.delete_books_batch", "DELETE", "/bookify/books/batch",
+             lambda c: {"ids": c.reserved_ids("books", 20)}, DESTRUCTIVE),
+    scenario("bookify.mark_all_books_read", "PUT", "/bookify/books/mark_all_read", phase=BULK),
+    scenario("bookify.delete_books_by_author", "DELETE",
+             lambda c: f"/bookify/books/author/{c.name()}", phase=BULK),
+
+    # --- TaskFlow ---
+    scenario("taskflow.home", "GET", "/taskflow/"),
+    scenario("taskflow.get_tasks", "GET", "/taskflow/tasks"),
+    scenario("taskflow.get_task", "GET", lambda c: f"/taskflow/tasks/{c.any_id()}"),
+    scenario("taskflow.search_tasks", "GET", lambda c: f"/taskflow/tasks/search?q={c.word()}"),
+    scenario("taskflow.completed_tasks", "GET", "/taskflow/tasks/completed"),
+    scenario("taskflow.pending_tasks", "GET", "/taskflow/tasks/pending"),
+    scenario("taskflow.random_task", "GET", "/taskflow/tasks/random"),
+    scenario("taskflow.task_stats", "GET", "/taskflow/tasks/stats"),
+    scenario("taskflow.recent_tasks", "GET", "/taskflow/tasks/recent"),
+    scenario("taskflow.export_tasks", "GET", "/taskflow/tasks/export"),
+    scenario("taskflow.task_changes", "GET", "/taskflow/changes?since=0"),
+    scenario("taskflow.create_task", "POST", "/taskflow/tasks",
+             lambda c: {"title": c.word(), "description": c.word()}, WRITE),
+    scenario("taskflow.update_task", "PUT", lambda c: f"/taskflow/tasks/{c.any_id()}",
+             {"completed": True}, WRITE),
+    scenario("taskflow.toggle_task", "PUT", lambda c: f"/taskflow/tasks/{c.any_id()}/toggle", phase=WRITE),
+    scenario("taskflow.create_tasks_batch", "POST", "/taskflow/tasks/batch",
+             lambda c: [{"title": c.word()} for _ in range(50)], WRITE),
+    scenario("taskflow.update_tasks_batch", "PATCH", "/taskflow/tasks/batch",
+             lambda c: [{"id": i, "completed": False} for i in c.any_ids(50)], WRITE),
+    scenario("taskflow.import_tasks", "POST", "/taskflow/tasks/import",
+             lambda c: _ndjson({"title": c.word()} for _ in range(100)),
+             WRITE, "application/x-ndjson"),
+    scenario("taskflow.delete_task", "DELETE", lambda c: f"/taskflow/tasks/{c.reserved_id('tasks')}",
+             phase=DESTRUCTIVE),
+    scenario("taskflow.delete_tasks_batch", "DELETE", "/taskflow/tasks/batch",
+             lambda c: {"ids": c.reserved_ids("tasks", 20)}, DESTRUCTIVE),
+    scenario("taskflow.toggle_all_tasks", "PUT", "/taskflow/tasks/toggle_all?completed=false",
+             phase=BULK),
+    scenario("taskflow.clear_completed_tasks", "DELETE", "/taskflow/tasks/clear_completed",
+             phase=BULK),
+
+    # --- NoteNest ---
+    scenario("notenest.home", "GET", "/notenest/"),
+    scenario("notenest.get_notes", "GET", "/notenest/notes"),
+    scenario("notenest.get_note", "GET", lambda c: f"/notenest/notes/{c.any_id()}"),
+    scenario("notenest.search_notes", "GET", lambda c: f"/notenest/notes/search?q={c.word()}"),
+    scenario("notenest.notes_containing", "GET", lambda c: f"/notenest/notes/contains/{c.word()}"),
+    scenario("notenest.recent_notes", "GET", "/notenest/notes/recent?days=7"),
+    scenario("notenest.sorted_notes", "GET", "/notenest/notes/sorted?order=asc"),
+    scenario("notenest.note_wordcount", "GET", "/notenest/notes/wordcount"),
+    scenario("notenest.note_summary", "GET", "/notenest/notes/summary"),
+    scenario("notenest.random_note", "GET", "/notenest/notes/random"),
+    scenario("notenest.export_notes", "GET", "/notenest/notes/export"),
+    scenario("notenest.note_changes", "GET", "/notenest/changes?since=0"),
+    scenario("notenest.create_note", "POST", "/notenest/notes",
+             lambda c: {"title": c.word(), "content": " ".join(c.word() for _ in range(40))}, WRITE),
+    scenario("notenest.update_note", "PUT", lambda c: f"/notenest/notes/{c.any_id()}",
+             lambda c: {"content": " ".join(c.word() for _ in range(40))}, WRITE),
+    scenario("notenest.create_notes_batch", "POST", "/notenest/notes/batch",
+             lambda c: [{"title": c.word(), "content": c.word()} for _ in range(50)], WRITE),
+    scenario("notenest.update_notes_batch", "PATCH", "/notenest/notes/batch",
+             lambda c: [{"id": i, "title": c.word()} for i in c.any_ids(50)], WRITE),
+    scenario("notenest.import_notes", "POST", "/notenest/notes/import",
+             lambda c: _ndjson({"title": c.word(), "content": c.word()} for _ in range(100)),
+             WRITE, "application/x-ndjson"),
+    scenario("notenest.delete_note", "DELETE", lambda c: f"/notenest/notes/{c.reserved_id('notes')}",
+             phase=DESTRUCTIVE),
+    scenario("notenest.delete_notes_batch", "DELETE", "/notenest/notes/batch",
+             lambda c: {"ids": c.reserved_ids("notes", 20)}, DESTRUCTIVE),
+    scenario("notenest.cleanup_old_notes", "DELETE", "/notenest/notes/cleanup?days=30",
+             phase=BULK),
+    scenario("notenest.clear_all_notes", "DELETE", "/notenest/notes/clear_all", phase=BULK),
+]
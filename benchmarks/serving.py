@@ -0,0 +1,163 @@
+# benchmarks/serving.py
+import http.client
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .harness import build_app, percentile, _git_commit
+from .scenarios import SCENARIOS, READ, Context
+
+PROFILES = ("sync", "gthread", "gevent", "asgi")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The same for every profile: gunicorn.conf.py reads GUNICORN_PROFILE from the environment
+COMMAND = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start(profile, port, database_url, log_file, heavy_concurrency):
+    # Every client shares 127.0.0.1, so the per-client limit stays off; heavy requests are still capped
+    env = dict(os.environ, GUNICORN_PROFILE=profile, PORT=str(port), DATABASE_URL=database_url,
+               RATE_LIMIT_ENABLED="false")
+    env.pop("HEAVY_CONCURRENCY", None)
+    if heavy_concurrency is not None:
+        env["HEAVY_CONCURRENCY"] = heavy_concurrency
+    proc = subprocess.Popen(COMMAND, cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=log_file)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            return None
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    return None
+
+
+def _stop(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def _client(port, specs, ctx, deadline):
+    """One keep-alive client sending read requests until ``deadline``."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    latencies, statuses = [], {}
+    while time.perf_counter() < deadline:
+        spec = ctx.rng.choice(specs)
+        path = spec["path"](ctx) if callable(spec["path"]) else spec["path"]
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            status = 0  # connection error
+        latencies.append(time.perf_counter() - started)
+        statuses[status] = statuses.get(status, 0) + 1
+    conn.close()
+    return latencies, statuses
+
+
+def drive(port, clients, duration, size, words, names):
+    """Hit the read routes from ``clients`` concurrent connections for ``duration`` seconds."""
+    specs = [spec for spec in SCENARIOS if spec["phase"] == READ and spec["method"] == "GET"]
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        futures = [
+            pool.submit(_client, port, specs, Context(random.Random(i), size, words, names), deadline)
+            for i in range(clients)
+        ]
+        results = [future.result() for future in futures]
+    wall = time.perf_counter() - started
+
+    latencies = [value for result, _ in results for value in result]
+    statuses = {}
+    for _, counts in results:
+        for status, n in counts.items():
+            statuses[status] = statuses.get(status, 0) + n
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+        # 503s are requests shed by admission control (or an exhausted pool), not failures
+        "errors": sum(n for code, n in statuses.items() if code == 0 or (code >= 500 and code != 503)),
+        "shed": sum(n for code, n in statuses.items() if code in (429, 503)),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(max(latencies) * 1000, 3)
+        } if latencies else None
+    }
+
+
+def serve(profiles=PROFILES, clients=100, duration=15, size=10000, database_url=None, log=print):
+    """Benchmark each gunicorn profile under ``clients`` concurrent connections."""
+    from seed import _pool
+
+    heavy_concurrency = os.environ.get("HEAVY_CONCURRENCY")  # before build_app turns it off
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "clients": clients,
+            "duration_s": duration,
+            "size": size,
+            "database": "custom" if database_url else "sqlite"
+        },
+        "profiles": {}
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite:///{os.path.join(tmp, 'serve.db')}"
+        log(f"⏱  Seeding {size} rows per table...")
+        app = build_app(url, size)
+        with app.app_context():
+            from database import db
+            db.engine.dispose()  # the servers open their own connections
+
+        for profile in profiles:
+            port = _free_port()
+            with open(os.path.join(tmp, f"{profile}.log"), "w+") as log_file:
+                proc = _start(profile, port, url, log_file, heavy_concurrency)
+                if proc is None:
+                    log_file.seek(0)
+                    reason = (log_file.read().strip().splitlines() or ["server did not start"])[-1]
+                    log(f"   {profile:<8} skipped: {reason}")
+                    report["profiles"][profile] = {"skipped": reason}
+                    continue
+                try:
+                    result = drive(port, clients, duration, size, _pool("words"), _pool("names"))
+                finally:
+                    _stop(proc)
+            report["profiles"][profile] = result
+            latency = result["latency_ms"] or {"p50": 0, "p99": 0}
+            log(f"   {profile:<8} {result['throughput_rps']:>9.1f} req/s  "
+                f"p50 {latency['p50']:>9.2f} ms  p99 {latency['p99']:>9.2f} ms  errors {result['errors']}  shed {result['shed']}")
+
+    return report
@@ -0,0 +1,57 @@
+# benchmarks/startup.py
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter, so every import is cold
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+status = application.test_client().get("/bookify/books?limit=1").status_code
+finished = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (finished - created) * 1000,
+    "status": status
+}))
+"""
+
+PHASES = ("import_ms", "create_app_ms", "first_request_ms", "total_ms")
+
+
+def measure_startup(database_url=None, runs=5, log=print):
+    """
+    Median cold-start cost over ``runs`` fresh interpreters.
+
+    Splits it into importing ``app``, ``create_app()`` and the first request,
+    which opens the first database connection; ``total_ms`` is their sum.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        if database_url is None:
+            from .harness import build_app
+            build_app(url, 100)
+        env = dict(os.environ, DATABASE_URL=url)
+        samples = []
+        for _ in range(runs):
+            output = subprocess.check_output([sys.executable, "-c", _PROBE], cwd=ROOT, env=env, text=True)
+            sample = json.loads(output.strip().splitlines()[-1])
+            if sample.pop("status") != 200:
+                raise RuntimeError("the first request failed during the startup benchmark")
+            sample["total_ms"] = sum(sample.values())
+            samples.append(sample)
+
+    result = {phase: round(statistics.median(s[phase] for s in samples), 1) for phase in PHASES}
+    result["runs"] = runs
+    log("   startup  " + "  ".join(f"{phase[:-3]} {result[phase]:.1f} ms" for phase in PHASES))
+    return result
@@ -1,12 +1,31 @@
+from datetime import datetime
+from sqlalchemy import func
 from database import db
+from search import full_text_index
+from changes import change_feed
+
+class AuthorCount(db.Model):
+    """Books per author, kept current by every book write path (see aggregates.py)."""
+    __tablename__ = 'author_counts'
+
+    author = db.Column(db.String(100), primary_key=True)
+    book_count = db.Column(db.Integer, nullable=False, default=0)
+
 
 class Book(db.Model):
     __tablename__ = 'books'
+    # The keys of to_dict(), selected as plain columns by list and export routes
+    FIELDS = ("id", "title", "author", "status")
+    # What list routes return unless ?fields= asks for more
+    LIST_FIELDS = FIELDS
+    # Summary tables maintained alongside the counters
+    TALLIES = [(AuthorCount, "author", "book_count")]
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(150), nullable=False)
     author = db.Column(db.String(100), nullable=False)
     status = db.Column(db.String(50), nullable=False, default="Not Read")
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def to_dict(self):
         return {
@@ -15,3 +34,26 @@ class Book(db.Model):
             "author": self.author,
             "status": self.status
         }
+
+    @staticmethod
+    def counts(row):
+        """Counter deltas contributed by one book (see aggregates.py)."""
+        return {"total": 1, f"status.{row['status']}": 1}
+
+    @classmethod
+    def recount(cls):
+        """Recompute the book counters with a single grouped query."""
+        rows = db.session.query(cls.status, func.count(cls.id)).group_by(cls.status).all()
+        totals = {f"status.{status}": count for status, count in rows}
+        totals["total"] = sum(count for _, count in rows)
+        return totals
+
+
+full_text_index(Book, "title", "author")
+change_feed(Book)
+
+# Mirrored by migrations/versions/0003_hot_filter_indexes.py
+db.Index("ix_books_author_lower", func.lower(Book.author))
+db.Index("ix_books_status_lower_id", func.lower(Book.status), Book.id)
+# Mirrored by migrations/versions/0006_author_counts.py; walks the leaderboard in rank order
+db.Index("ix_author_counts_rank", AuthorCount.book_count, AuthorCount.author)
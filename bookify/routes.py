@@ -1,7 +1,18 @@
 from flask import Blueprint, request, jsonify
-from .models import db, Book
+from .models import db, AuthorCount, Book
 from sqlalchemy import func
-import random
+from pagination import paginate, paginate_records
+from streaming import stream_export
+from importer import import_rows
+from search import text_search
+from sampling import random_rows, sample_size
+import aggregates
+from cache import row_cache
+from conditional import conditional
+from admission import cost, long_lived
+import batch
+import changes
+import jobs
 
 bookify_bp = Blueprint('bookify', __name__)
 
@@ -11,41 +22,60 @@ def home():
         "message": "Welcome to Bookify API 📚",
         "endpoints": [
             "/books (GET, POST)",
-            "/books/<id> (GET, PUT, DELETE)"
+            "/books/<id> (GET, PUT, DELETE)",
+            "/changes (GET, text/event-stream)"
         ]
     })
 
+def _book_fields(data, partial=False):
+    """Validate a book payload; returns ``(fields, error)``."""
+    if partial:
+        fields = {key: data[key] for key in ('title', 'author', 'status') if key in data}
+        if not all(fields.values()):
+            return None, "Title, author and status cannot be empty"
+        return fields, None
+    if not data.get('title') or not data.get('author'):
+        return None, "Title and author are required"
+    return {
+        "title": data['title'],
+        "author": data['author'],
+        "status": data.get('status', 'Not Read')
+    }, None
+
+
 # --- CREATE ---
 @bookify_bp.route('/books', methods=['POST'])
 def add_book():
-    data = request.get_json()
-    title = data.get('title')
-    author = data.get('author')
-    status = data.get('status', 'Not Read')
+    fields, error = _book_fields(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
 
-    if not title or not author:
-        return jsonify({"error": "Title and author are required"}), 400
-
-    new_book = Book(title=title, author=author, status=status)
+    new_book = Book(**fields)
     db.session.add(new_book)
+    aggregates.track(Book, after=aggregates.snapshot(new_book))
     db.session.commit()
     return jsonify(new_book.to_dict()), 201
 
 
 # --- READ ALL ---
 @bookify_bp.route('/books', methods=['GET'])
+@conditional(Book)
 def get_books():
-    books = Book.query.all()
-    return jsonify([book.to_dict() for book in books])
+    books, next_cursor = paginate_records(Book, Book.query, Book.id)
+    return jsonify({
+        "books": books,
+        "next_cursor": next_cursor
+    })
 
 
 # --- READ ONE ---
 @bookify_bp.route('/books/<int:book_id>', methods=['GET'])
+@conditional()
 def get_book(book_id):
-    book = Book.query.get(book_id)
-    if not book:
+    payload = row_cache.fetch(Book, book_id)
+    if payload is None:
         return jsonify({"error": "Book not found"}), 404
-    return jsonify(book.to_dict())
+    return jsonify(payload)
 
 
 # --- UPDATE ---
@@ -56,10 +86,13 @@ def update_book(book_id):
         return jsonify({"error": "Book not found"}), 404
 
     data = request.get_json()
+    before = aggregates.snapshot(book)
     book.title = data.get('title', book.title)
     book.author = data.get('author', book.author)
     book.status = data.get('status', book.status)
+    aggregates.track(Book, before, aggregates.snapshot(book))
     db.session.commit()
+    row_cache.invalidate(Book, book_id)
 
     return jsonify(book.to_dict())
 
@@ -71,47 +104,94 @@ def delete_book(book_id):
     if not book:
         return jsonify({"error": "Book not found"}), 404
 
+    aggregates.track(Book, before=aggregates.snapshot(book))
     db.session.delete(book)
     db.session.commit()
+    row_cache.invalidate(Book, book_id)
     return jsonify({"message": f"Book {book_id} deleted successfully"})
 
-# --- 1. Search books by title or author ---
+# --- BATCH CREATE / UPDATE / DELETE ---
+@bookify_bp.route('/books/batch', methods=['POST'])
+@cost(5)
+def add_books_batch():
+    return batch.create(Book, request.get_json(), _book_fields)
+
+
+@bookify_bp.route('/books/batch', methods=['PATCH'])
+@cost(5)
+def update_books_batch():
+    return batch.update_many(Book, request.get_json(), _book_fields)
+
+
+@bookify_bp.route('/books/batch', methods=['DELETE'])
+@cost(5)
+def delete_books_batch():
+    return batch.delete_many(Book, request.get_json())
+
+
+# --- 1. Search books by title or author (full-text, ranked) ---
 @bookify_bp.route('/books/search')
+@cost(2)
+@conditional(Book)
 def search_books():
     query = request.args.get('q', '')
-    results = Book.query.filter(
-        (Book.title.ilike(f"%{query}%")) | (Book.author.ilike(f"%{query}%"))
-    ).all()
-    return jsonify([book.to_dict() for book in results])
+    results, next_cursor = paginate_records(Book, *text_search(Book, query, Book.title, Book.author))
+    return jsonify({
+        "books": results,
+        "next_cursor": next_cursor
+    })
 
 
-# --- 2. Get all books by a specific author ---
+# --- 2. Get all books by a specific author (?exact=true matches the whole name) ---
 @bookify_bp.route('/books/author/<string:author_name>')
+@conditional(Book)
 def books_by_author(author_name):
-    books = Book.query.filter(Book.author.ilike(f"%{author_name}%")).all()
-    return jsonify([book.to_dict() for book in books])
+    if request.args.get('exact', 'false').lower() == 'true':
+        # Served by the lower(author) index
+        condition = func.lower(Book.author) == author_name.lower()
+    else:
+        condition = Book.author.ilike(f"%{author_name}%")
+    books, next_cursor = paginate_records(Book, Book.query.filter(condition), Book.id)
+    return jsonify({
+        "books": books,
+        "next_cursor": next_cursor
+    })
 
 
 # --- 3. Get all books with a specific status (e.g. Read, Not Read) ---
 @bookify_bp.route('/books/status/<string:status>')
+@conditional(Book)
 def books_by_status(status):
-    books = Book.query.filter(Book.status.ilike(status)).all()
-    return jsonify([book.to_dict() for book in books])
+    books, next_cursor = paginate_records(Book, Book.query.filter(func.lower(Book.status) == status.lower()), Book.id)
+    return jsonify({
+        "books": books,
+        "next_cursor": next_cursor
+    })
+
+
+# Table-wide changes run as chunked background jobs (see jobs.py)
+jobs.register("bookify.mark_read", Book,
+              where=lambda p: Book.author.ilike(f"%{p['author']}%") if 'author' in p else None,
+              values=lambda p: {"status": "Read"})
+jobs.register("bookify.delete_by_author", Book,
+              where=lambda p: Book.author.ilike(f"%{p['author']}%"))
 
 
-# --- 4. Bulk mark all books as "Read" ---
+# --- 4. Bulk mark all books as "Read" (202 + job) ---
 @bookify_bp.route('/books/mark_all_read', methods=['PUT'])
+@cost(5)
 def mark_all_books_read():
-    updated = Book.query.update({Book.status: "Read"})
-    db.session.commit()
-    return jsonify({"message": f"{updated} books marked as Read"})
+    return jobs.enqueue("bookify.mark_read")
 
 
 # --- 5. Get book statistics (total, read, unread) ---
 @bookify_bp.route('/books/stats')
+@cost(2)
+@conditional(Book)
 def book_stats():
-    total = Book.query.count()
-    read_count = Book.query.filter(Book.status == "Read").count()
+    counts = aggregates.totals(Book)
+    total = counts.get("total", 0)
+    read_count = counts.get("status.Read", 0)
     unread_count = total - read_count
     return jsonify({
         "total_books": total,
@@ -120,45 +200,65 @@ def book_stats():
     })
 
 
-# --- 6. Get a random book ---
+# --- 6. Get a random book (or ?n= random books) ---
 @bookify_bp.route('/books/random')
+@cost(5)
 def random_book():
-    books = Book.query.all()
+    n = sample_size()
+    books = random_rows(Book, n or 1)
     if not books:
         return jsonify({"message": "No books available"}), 404
-    book = random.choice(books)
-    return jsonify(book.to_dict())
+    if n is not None:
+        return jsonify({"books": [book.to_dict() for book in books]})
+    return jsonify(books[0].to_dict())
 
 
-# --- 7. Get top authors by number of books ---
+# --- 7. Get top authors by number of books (?limit= top N, ?after= next page) ---
 @bookify_bp.route('/books/top-authors')
+@conditional(Book)
 def top_authors():
-    from sqlalchemy import func
-    data = db.session.query(Book.author, func.count(Book.id)).group_by(Book.author).all()
-    return jsonify([{"author": a, "book_count": c} for a, c in data])
+    # Most books first; each page is one range scan of the (book_count, author) index
+    rows, next_cursor = paginate(
+        db.session.query(AuthorCount.author, AuthorCount.book_count),
+        AuthorCount.book_count, AuthorCount.author, descending=True
+    )
+    return jsonify({
+        "authors": [{"author": a, "book_count": c} for a, c in rows],
+        "next_cursor": next_cursor
+    })
 
 
-# --- 8. Delete all books by a given author ---
+# --- 8. Delete all books by a given author (202 + job) ---
 @bookify_bp.route('/books/author/<string:author_name>', methods=['DELETE'])
+@cost(5)
 def delete_books_by_author(author_name):
-    deleted = Book.query.filter(Book.author.ilike(f"%{author_name}%")).delete()
-    db.session.commit()
-    return jsonify({"message": f"{deleted} books deleted for author '{author_name}'"})
+    return jobs.enqueue("bookify.delete_by_author", {"author": author_name})
 
 
-# --- 9. Update all books by an author (e.g. mark as read) ---
+# --- 9. Mark all books by an author as read (202 + job) ---
 @bookify_bp.route('/books/author/<string:author_name>/mark_read', methods=['PUT'])
+@cost(5)
 def mark_author_books_read(author_name):
-    updated = Book.query.filter(Book.author.ilike(f"%{author_name}%")).update({Book.status: "Read"})
-    db.session.commit()
-    return jsonify({"message": f"{updated} books by '{author_name}' marked as Read"})
+    return jobs.enqueue("bookify.mark_read", {"author": author_name})
 
 
 # --- 10. Export all books as JSON (for backup) ---
 @bookify_bp.route('/books/export')
+@cost(20)
+@conditional(Book)
 def export_books():
-    books = Book.query.all()
-    return jsonify({
-        "exported_count": len(books),
-        "books": [book.to_dict() for book in books]
-    })
+    return stream_export(Book.query.order_by(Book.id), "books")
+
+
+# --- 11. Import books from NDJSON or CSV (counterpart to export) ---
+@bookify_bp.route('/books/import', methods=['POST'])
+@cost(20)
+def import_books():
+    return import_rows(Book, _book_fields)
+
+
+# --- 12. Live feed of book changes (Server-Sent Events), resumable with Last-Event-ID or ?since= ---
+@bookify_bp.route('/changes')
+@long_lived
+def book_changes():
+    return changes.stream(Book)
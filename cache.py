@@ -0,0 +1,119 @@
+# cache.py
+import threading
+import time
+from collections import OrderedDict
+
+from flask import jsonify
+
+from database import db
+import replicas
+
+
+class MemoryBackend:
+    """A bounded, thread-safe LRU store whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries=10000, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self, prefix=""):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RowCache:
+    """
+    Read-through cache of ``to_dict()`` payloads keyed by ``(model, id)``.
+
+    Any object with ``get``/``set``/``delete``/``clear(prefix)`` can serve as
+    the backend, so a shared store can replace the in-process default.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(model, row_id):
+        return f"{model.__tablename__}:{row_id}"
+
+    def fetch(self, model, row_id):
+        """Return the payload for one row, loading it on a miss; ``None`` if it does not exist."""
+        key = self._key(model, row_id)
+        payload = self.backend.get(key)
+        if payload is not None:
+            self.hits += 1
+            return payload
+        self.misses += 1
+        row = db.session.get(model, row_id)
+        if row is None:
+            return None
+        payload = row.to_dict()
+        # A lagging replica's copy could outlive the write that invalidated it
+        if not replicas.on_replica():
+            self.backend.set(key, payload)
+        return payload
+
+    def invalidate(self, model, row_id):
+        self.backend.delete(self._key(model, row_id))
+
+    def invalidate_all(self, model):
+        """Drop every cached row of ``model``; used after bulk statements."""
+        self.backend.clear(f"{model.__tablename__}:")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "entries": len(self.backend) if hasattr(self.backend, "__len__") else None
+        }
+
+
+row_cache = RowCache()
+
+
+def init_app(app):
+    """Configure ``row_cache`` from ``ROW_CACHE_*`` settings and expose ``/cache/stats``."""
+    backend = app.config.get("ROW_CACHE_BACKEND")
+    if backend is None:
+        backend = MemoryBackend(
+            max_entries=app.config.get("ROW_CACHE_SIZE", 10000),
+            ttl=app.config.get("ROW_CACHE_TTL", 30)
+        )
+    row_cache.backend = backend
+
+    @app.route("/cache/stats")
+    def cache_stats():
+        return jsonify(row_cache.stats())
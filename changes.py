@@ -0,0 +1,305 @@
+# changes.py
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import Response, current_app, jsonify, request, stream_with_context
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import delete, func, inspect, select, text
+
+from aggregates import Counter
+from database import db
+import jobs
+
+POLL_SECONDS = 1.0
+HEARTBEAT_SECONDS = 15
+# Streams end after this long (and one poll at least); EventSource reconnects with
+# Last-Event-ID and picks up where it left off
+STREAM_SECONDS = 300
+# How long an EventSource waits before reconnecting
+RETRY_MS = 2000
+BATCH_SIZE = 500
+RETENTION_HOURS = 24
+PRUNE_SECONDS = 300
+
+# Highest sequence number deleted by ``prune``; resuming from before it needs a full refetch
+PRUNED_COUNTER = "changes.pruned_through"
+
+# tablename -> model, for tables whose writes are recorded by triggers
+FEEDS = {}
+
+
+class Change(db.Model):
+    """One row created, updated or deleted, written by a trigger on the row's table."""
+    __tablename__ = 'changes'
+    # AUTOINCREMENT: SQLite must never hand out a sequence number again, even after pruning
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(6), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+def change_feed(model):
+    """
+    Record every insert, update and delete on ``model``'s table in ``changes``.
+
+    Triggers do the recording, so ORM writes, bulk statements, background
+    jobs and COPY imports all show up, in the same transaction as the rows.
+    They are created by ``create_change_triggers``.
+    """
+    FEEDS[model.__tablename__] = model
+
+
+def _sqlite_ddl(table):
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_changes_{suffix} AFTER {event} ON {table} BEGIN
+              INSERT INTO changes (table_name, row_id, op, created_at)
+              VALUES ('{table}', {ref}.id, '{op}', CURRENT_TIMESTAMP);
+            END"""
+        for suffix, event, ref, op in (
+            ("ai", "INSERT", "new", "create"),
+            ("au", "UPDATE", "new", "update"),
+            ("ad", "DELETE", "old", "delete"),
+        )
+    ]
+
+
+# Statement-level triggers read the affected rows from a transition table, so a
+# bulk statement logs its rows with one INSERT ... SELECT instead of one per row
+_POSTGRESQL_FUNCTIONS = [
+    f"""CREATE OR REPLACE FUNCTION changes_after_{op}() RETURNS trigger AS $$
+        BEGIN
+          INSERT INTO changes (table_name, row_id, op, created_at)
+          SELECT TG_TABLE_NAME, id, '{op}', now() AT TIME ZONE 'utc' FROM {rows} ORDER BY id;
+          RETURN NULL;
+        END $$ LANGUAGE plpgsql"""
+    for op, rows in (("create", "new_rows"), ("update", "new_rows"), ("delete", "old_rows"))
+]
+
+
+def _postgresql_ddl(table):
+    statements = []
+    for suffix, event, transition, op in (
+        ("ai", "INSERT", "NEW TABLE AS new_rows", "create"),
+        ("au", "UPDATE", "NEW TABLE AS new_rows", "update"),
+        ("ad", "DELETE", "OLD TABLE AS old_rows", "delete"),
+    ):
+        statements += [
+            f"DROP TRIGGER IF EXISTS {table}_changes_{suffix} ON {table}",
+            f"""CREATE TRIGGER {table}_changes_{suffix} AFTER {event} ON {table}
+                REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION changes_after_{op}()""",
+        ]
+    return statements
+
+
+def trigger_ddl(dialect, tables):
+    """
+    Statements that (re)create the change-log triggers of ``tables``; empty for other dialects.
+
+    The one definition of the triggers: migration 0007 runs them for its own
+    table list, and ``create_change_triggers`` for the registered feeds.
+    """
+    if dialect == "sqlite":
+        return [s for table in tables for s in _sqlite_ddl(table)]
+    if dialect == "postgresql":
+        return _POSTGRESQL_FUNCTIONS + [s for table in tables for s in _postgresql_ddl(table)]
+    return []
+
+
+def create_change_triggers():
+    """Create the change-log triggers of every registered table; safe to call on every startup."""
+    with db.engine.begin() as conn:
+        if not inspect(conn).has_table(Change.__tablename__):
+            return
+        for statement in trigger_ddl(db.engine.dialect.name, FEEDS):
+            conn.execute(text(statement))
+
+
+def _pruned_through():
+    counter = db.session.get(Counter, PRUNED_COUNTER)
+    return counter.value if counter else 0
+
+
+def latest():
+    """The sequence number of the newest change, or 0 if none was ever recorded."""
+    return db.session.query(func.max(Change.id)).scalar() or _pruned_through()
+
+
+def prune(retention_hours=RETENTION_HOURS):
+    """Delete changes older than ``retention_hours``; returns how many went."""
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    through = db.session.query(func.max(Change.id)).filter(Change.created_at < cutoff).scalar()
+    if through is None:
+        return 0
+    deleted = db.session.execute(delete(Change).where(Change.id <= through)).rowcount
+    updated = Counter.query.filter_by(name=PRUNED_COUNTER).update(
+        {Counter.value: through}, synchronize_session=False
+    )
+    if not updated:
+        db.session.add(Counter(name=PRUNED_COUNTER, value=through))
+    db.session.commit()
+    return deleted
+
+
+def _resume_point():
+    """``Last-Event-ID`` (sent by reconnecting EventSources) or ``?since=``; ``None`` means from now."""
+    value = request.headers.get("Last-Event-ID") or request.args.get("since")
+    if value is None:
+        return None
+    if not value.isdigit():
+        raise ValueError("since must be a non-negative integer sequence number")
+    return int(value)
+
+
+def _event(name, seq, payload):
+    data = current_app.json.dumps(payload)
+    return f"id: {seq}\nevent: {name}\ndata: {data}\n\n"
+
+
+def _read(after, size):
+    """
+    The next ``size`` changes after sequence number ``after``, from every table.
+
+    Other tables' changes are read too, so that holes in the sequence can be
+    told apart from rows that are simply not ours.
+    """
+    return db.session.query(Change.id, Change.table_name, Change.row_id, Change.op) \
+        .filter(Change.id > after).order_by(Change.id).limit(size).all()
+
+
+def _payloads(rows):
+    """Current ``to_dict()`` of the rows behind create and update events, one IN query per table."""
+    wanted = {}
+    for row in rows:
+        if row.op != "delete":
+            wanted.setdefault(row.table_name, set()).add(row.row_id)
+    payloads = {}
+    for table, ids in wanted.items():
+        model = FEEDS[table]
+        for obj in model.query.filter(model.id.in_(ids)):
+            payloads[table, obj.id] = obj.to_dict()
+    return payloads
+
+
+def _snapshot(bound):
+    """``txid_snapshot_xmin`` or ``_xmax`` of a fresh PostgreSQL snapshot, on the engine reads use."""
+    return db.session.execute(select(getattr(func, f"txid_snapshot_{bound}")(func.txid_current_snapshot()))).scalar()
+
+
+def _changes(since, tables, config):
+    poll = config.get("CHANGES_POLL_SECONDS", POLL_SECONDS)
+    heartbeat = config.get("CHANGES_HEARTBEAT_SECONDS", HEARTBEAT_SECONDS)
+    size = config.get("CHANGES_BATCH_SIZE", BATCH_SIZE)
+    deadline = time.monotonic() + config.get("CHANGES_STREAM_SECONDS", STREAM_SECONDS)
+    # PostgreSQL hands out sequence numbers before commit, so a lower one can still
+    # appear after a higher one is visible. SQLite commits one writer at a time.
+    concurrent = db.engine.dialect.name == "postgresql"
+
+    yield f"retry: {config.get('CHANGES_RETRY_MS', RETRY_MS)}\n\n"
+    if since < _pruned_through():
+        # The changes this client missed are gone: it has to refetch, then follow from here
+        since = latest()
+        yield _event("reset", since, {"seq": since})
+    last, quiet_since = since, time.monotonic()
+    # (xmax, through) of the snapshot taken when a hole was seen: every transaction that
+    # may own a sequence number up to ``through`` has an xid below ``xmax``
+    pending = None
+
+    while True:
+        settled_through = 0
+        if pending and _snapshot("xmin") >= pending[0]:
+            # All of them have ended, so holes up to ``through`` were rolled back for good
+            settled_through, pending = pending[1], None
+        rows = _read(last, size)
+        ours, held = [], False
+        for row in rows:
+            if row.id != last + 1 and concurrent and row.id - 1 > settled_through:
+                if pending is None:
+                    pending = (_snapshot("xmax"), rows[-1].id)
+                held = True
+                break
+            last = row.id
+            if row.table_name in tables:
+                ours.append(row)
+
+        payloads = _payloads(ours)
+        # Release the connection between polls, and let SQLite's WAL move past this snapshot
+        db.session.rollback()
+
+        for row in ours:
+            yield _event(row.op, row.id, {
+                "seq": row.id, "table": row.table_name, "op": row.op, "id": row.row_id,
+                "data": payloads.get((row.table_name, row.row_id))
+            })
+        if ours:
+            quiet_since = time.monotonic()
+        elif time.monotonic() - quiet_since >= heartbeat:
+            # Keeps proxies from closing an idle stream and moves Last-Event-ID past other tables' changes
+            yield f": keepalive\nid: {last}\n\n"
+            quiet_since = time.monotonic()
+        if time.monotonic() >= deadline:
+            return
+        if held or len(rows) < size:
+            time.sleep(poll)
+
+
+def stream(*models):
+    """
+    Serve the changes of ``models``' tables as Server-Sent Events.
+
+    Each event is named after its operation (``create``, ``update``,
+    ``delete``), carries the change's sequence number as its id and the
+    row's current ``to_dict()`` as ``data``. Streams start from now, or
+    resume after ``Last-Event-ID``/``?since=``; a ``reset`` event means the
+    requested changes were pruned and the client must refetch.
+    """
+    try:
+        since = _resume_point()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if since is None:
+        since = latest()
+        db.session.rollback()
+    tables = {model.__tablename__ for model in models}
+    body = _changes(since, tables, current_app.config)
+    response = Response(stream_with_context(body), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop nginx-style proxies from buffering events
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+changes_cli = AppGroup("changes", help="Change feed commands.")
+
+
+@changes_cli.command("prune")
+@click.option("--hours", default=None, type=float, help="Keep this many hours of changes.")
+@with_appcontext
+def prune_command(hours):
+    """Delete old entries from the change log."""
+    hours = hours if hours is not None else current_app.config.get("CHANGES_RETENTION_HOURS", RETENTION_HOURS)
+    print(f"🧹 Pruned {prune(hours)} changes older than {hours:g} hours")
+
+
+def _prune_expired():
+    prune(current_app.config.get("CHANGES_RETENTION_HOURS", RETENTION_HOURS))
+
+
+def init_app(app):
+    """
+    Add ``flask changes prune`` and prune the change log in the background.
+
+    Every ``CHANGES_PRUNE_SECONDS``, the job workers (see jobs.py) delete
+    changes older than ``CHANGES_RETENTION_HOURS``; requests never wait on it.
+    """
+    app.cli.add_command(changes_cli)
+    for name, default in (("CHANGES_STREAM_SECONDS", STREAM_SECONDS), ("CHANGES_POLL_SECONDS", POLL_SECONDS),
+                          ("CHANGES_RETENTION_HOURS", RETENTION_HOURS)):
+        value = os.environ.get(name)
+        if value is not None:
+            app.config.setdefault(name, type(default)(value))
+    jobs.every("changes.prune", app.config.get("CHANGES_PRUNE_SECONDS", PRUNE_SECONDS), _prune_expired)
@@ -0,0 +1,132 @@
+# compression.py
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: br is simply not offered
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is simply not offered
+    zstandard = None
+
+COMPRESSIBLE_TYPES = {"application/json", "application/x-ndjson", "text/csv", "text/plain", "text/html"}
+
+
+class _Gzip:
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        # A sync flush hands the client everything so far without ending the stream
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+class _Brotli:
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class _Zstd:
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+# Content-Encoding -> (compressor, config key for its level, default level), best first
+ENCODINGS = {"gzip": (_Gzip, "COMPRESS_LEVEL", 6)}
+if brotli:
+    ENCODINGS = {"br": (_Brotli, "COMPRESS_BR_LEVEL", 4), **ENCODINGS}
+if zstandard:
+    ENCODINGS = {"zstd": (_Zstd, "COMPRESS_ZSTD_LEVEL", 3), **ENCODINGS}
+
+
+def choose_encoding(accept, allowed):
+    """Pick the encoding the client rates highest, breaking ties by server preference."""
+    best, best_quality = None, 0
+    for name in allowed:
+        quality = accept[name]
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def _compressed_stream(chunks, compressor, original):
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            yield data + compressor.flush()
+        yield compressor.finish()
+    finally:
+        # Werkzeug only closes the iterable it was given, which is now this generator
+        close = getattr(original, "close", None)
+        if close:
+            close()
+
+
+def init_app(app):
+    """
+    Compress responses negotiated through ``Accept-Encoding``.
+
+    Offers zstd and br when ``zstandard``/``brotli`` are installed, otherwise
+    gzip. Buffered bodies smaller than ``COMPRESS_MIN_SIZE`` bytes are sent
+    as-is; streamed bodies are compressed chunk by chunk and flushed after
+    each one, so clients still receive rows as they are produced.
+    """
+    min_size = app.config.get("COMPRESS_MIN_SIZE", 1024)
+    allowed = [name for name in app.config.get("COMPRESS_ALGORITHMS", ENCODINGS) if name in ENCODINGS]
+
+    @app.after_request
+    def compress(response):
+        if (response.mimetype not in COMPRESSIBLE_TYPES or response.status_code < 200
+                or response.status_code in (204, 206, 304) or request.method == "HEAD"):
+            return response
+        response.vary.add("Accept-Encoding")
+        if "Content-Encoding" in response.headers or response.direct_passthrough:
+            return response
+        if "no-transform" in response.headers.get("Cache-Control", ""):
+            return response
+
+        encoding = choose_encoding(request.accept_encodings, allowed)
+        if encoding is None:
+            return response
+        factory, level_key, default_level = ENCODINGS[encoding]
+        compressor = factory(app.config.get(level_key, default_level))
+
+        if response.is_streamed:
+            original = response.response
+            response.response = _compressed_stream(response.iter_encoded(), compressor, original)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            response.set_data(compressor.compress(data) + compressor.finish())
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,71 @@
+# conditional.py
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, current_app, make_response, request
+
+import aggregates
+
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+
+def _cache_control(default):
+    """``CACHE_CONTROL`` maps endpoint names to overrides, e.g. ``{"bookify.book_stats": "max-age=5"}``."""
+    overrides = current_app.config.get("CACHE_CONTROL", {})
+    return overrides.get(request.endpoint, default or current_app.config.get(
+        "CACHE_CONTROL_DEFAULT", DEFAULT_CACHE_CONTROL))
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified and request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional(*models, cache_control=None):
+    """
+    Serve a GET route with ETag/Last-Modified validators and 304 responses.
+
+    With ``models``, validators come from their table versions (see
+    ``aggregates.bump_version``), so a revalidation costs one small query and
+    never reaches the view. Without models, the ETag is a hash of the
+    response body, which suits routes that are already cheap to render.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            policy = _cache_control(cache_control)
+            if not models:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    response.headers["Cache-Control"] = policy
+                    response.add_etag(weak=True)
+                    response.make_conditional(request)
+                return response
+
+            stamps = aggregates.versions(*models)
+            key = f"{request.full_path}|{','.join(map(str, stamps))}"
+            etag = hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+            last_modified = None
+            # HTTP dates stop at seconds: a write later in the newest stamp's second would get the
+            # same Last-Modified and a stale 304, so until that second is over only the ETag validates
+            if all(stamps) and max(stamps) // 1000 < int(time.time()):
+                last_modified = datetime.fromtimestamp(max(stamps) // 1000, tz=timezone.utc)
+
+            if _not_modified(etag, last_modified):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers["Cache-Control"] = policy
+            return response
+        return wrapper
+    return decorator
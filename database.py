@@ -1,4 +1,35 @@
 # database.py
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 
-db = SQLAlchemy()
+
+class RoutingSession(Session):
+    """
+    Runs SELECTs on ``g.read_engine`` when ``replicas`` picked one for the request.
+
+    Anything else (flushes, DML, raw SQL) goes to the primary and sends the
+    rest of the request's reads there too, so a request reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context() and "read_engine" in g:
+            if getattr(clause, "is_select", False):
+                return g.read_engine
+            g.pop("read_engine")
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+def init_migrate(app):
+    """
+    Set up Flask-Migrate for ``flask db``.
+
+    Schema changes ship as versioned migrations in migrations/; run
+    ``flask db upgrade``. Only CLI commands need it, and importing alembic
+    takes about as long as the rest of the app, so servers skip it.
+    """
+    from flask_migrate import Migrate
+    Migrate(app, db, render_as_batch=True)
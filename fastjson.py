@@ -0,0 +1,56 @@
+# fastjson.py
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+
+def _default(o):
+    # ISO 8601 like to_dict(), rather than Flask's HTTP dates
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's provider, minus key sorting, encoding dates the way the models do."""
+
+    default = staticmethod(_default)
+    sort_keys = False
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """
+    Serialize with orjson, which encodes dicts, lists and datetimes natively.
+
+    Calls passing stdlib options (``indent`` and the like) and values orjson
+    rejects, such as integers beyond 64 bits, go through the stdlib provider.
+    """
+
+    options = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:
+            try:
+                return orjson.dumps(obj, default=_default, option=self.options).decode()
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(f"{self.dumps(obj)}\n", mimetype=self.mimetype)
+
+
+def provider(app):
+    """The fastest JSON provider available, bound to ``app``."""
+    return OrjsonProvider(app) if orjson else StdlibJSONProvider(app)
@@ -0,0 +1,69 @@
+# gunicorn.conf.py
+#
+# Serving profiles, picked with GUNICORN_PROFILE:
+#   sync    - one request at a time per process (gunicorn's default)
+#   gthread - a few processes, each with a thread pool (default)
+#   gevent  - cooperative greenlets; needs gevent and psycogreen
+#   asgi    - the ASGI adapter in asgi.py under uvicorn workers
+# WEB_CONCURRENCY and GUNICORN_THREADS override the computed sizes.
+import gc
+import multiprocessing
+import os
+
+profile = os.environ.get("GUNICORN_PROFILE", "gthread")
+cores = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+wsgi_app = "asgi:create_application()" if profile == "asgi" else "app:create_app()"
+
+if profile == "sync":
+    worker_class = "sync"
+    workers = int(os.environ.get("WEB_CONCURRENCY", cores * 2 + 1))
+    threads = 1
+elif profile == "gthread":
+    worker_class = "gthread"
+    workers = int(os.environ.get("WEB_CONCURRENCY", cores + 1))
+    threads = int(os.environ.get("GUNICORN_THREADS", 8))
+elif profile == "gevent":
+    worker_class = "gevent"
+    workers = int(os.environ.get("WEB_CONCURRENCY", cores))
+    threads = 1
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 1000))
+    # Greenlets share the pool; size it for concurrent queries, not open sockets
+    os.environ.setdefault("DB_POOL_SIZE", "20")
+elif profile == "asgi":
+    worker_class = "uvicorn.workers.UvicornWorker"
+    workers = int(os.environ.get("WEB_CONCURRENCY", cores + 1))
+    threads = 1
+    # Requests run on asgiref's executor threads, which default to min(32, cores + 4)
+    os.environ.setdefault("DB_POOL_SIZE", str(min(32, cores + 4)))
+else:
+    raise RuntimeError(f"Unknown GUNICORN_PROFILE {profile!r}")
+
+# Workers inherit this, so pooling.engine_options sizes one connection per thread
+os.environ.setdefault("GUNICORN_THREADS", str(threads))
+
+# Build the app once in the master and fork workers from it: they boot at once and
+# share its memory copy-on-write. pooling.py drops inherited connections in each child.
+# Not with gevent, whose workers must patch the stdlib before the app is imported.
+preload_app = os.environ.get("GUNICORN_PRELOAD", str(profile != "gevent")).lower() in ("1", "true", "yes")
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+keepalive = 5
+# Restart workers now and then so slow leaks cannot build up
+max_requests = 10000
+max_requests_jitter = 1000
+
+
+def pre_fork(server, worker):
+    # Keep the preloaded objects out of the workers' garbage collections, which
+    # would otherwise write to (and so copy) every shared page they touch
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if profile == "gevent":
+        # gunicorn has already monkey-patched the stdlib; psycopg2 needs its own hook
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
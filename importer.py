@@ -0,0 +1,209 @@
+# importer.py
+import codecs
+import csv
+import json
+from datetime import datetime
+from io import StringIO
+
+from flask import request, jsonify
+from sqlalchemy import insert, text
+from sqlalchemy.exc import SQLAlchemyError
+
+import aggregates
+from database import db
+from pagination import bad_request
+
+IMPORT_CHUNK_SIZE = 1000
+# Rows per transaction are held in memory, so clients cannot ask for more than this
+IMPORT_MAX_CHUNK_SIZE = 10000
+MAX_REPORTED_ERRORS = 100
+
+
+def _ndjson_records(lines):
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f"Invalid JSON: {exc}"
+            continue
+        if isinstance(record, dict):
+            yield number, record, None
+        else:
+            yield number, None, "Expected a JSON object"
+
+
+def _csv_records(lines):
+    reader = csv.DictReader(lines)
+    for record in reader:
+        # Blank cells mean "not given" so the validator applies its defaults
+        yield reader.line_num, {k: v for k, v in record.items() if k and v != ""}, None
+
+
+def _coerce(model, record):
+    """Convert CSV strings into the Python types of ``model``'s columns."""
+    columns = model.__table__.columns
+    converted = {}
+    for key, value in record.items():
+        column = columns.get(key)
+        if column is not None and isinstance(value, str):
+            if isinstance(column.type, db.Boolean):
+                value = value.strip().lower() in ("1", "true", "t", "yes", "y")
+            elif isinstance(column.type, db.Integer):
+                value = int(value)
+        converted[key] = value
+    return converted
+
+
+def _passthrough(model, record, fields):
+    """Carry over exported columns the validator does not handle, such as ``id``."""
+    for column in model.__table__.columns:
+        if column.key in record and column.key not in fields:
+            value = record[column.key]
+            if isinstance(column.type, db.DateTime) and isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            fields[column.key] = value
+    return fields
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t")
+        .replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def _write_chunk(model, rows):
+    """Insert one chunk: COPY on PostgreSQL, executemany everywhere else."""
+    if db.engine.dialect.name != "postgresql":
+        for keys in {tuple(row) for row in rows}:
+            db.session.execute(insert(model), [row for row in rows if tuple(row) == keys])
+        return
+
+    # COPY bypasses Python-side column defaults such as updated_at, so apply them here
+    for column in model.__table__.columns:
+        default = column.default
+        if default is None or not (default.is_scalar or default.is_callable):
+            continue
+        for row in rows:
+            if column.key not in row:
+                row[column.key] = default.arg(None) if default.is_callable else default.arg
+
+    for keys in {tuple(row) for row in rows}:
+        buffer = StringIO()
+        for row in rows:
+            if tuple(row) == keys:
+                buffer.write("\t".join(_copy_value(row[key]) for key in keys) + "\n")
+        buffer.seek(0)
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert(
+            f"COPY {model.__tablename__} ({', '.join(keys)}) FROM STDIN", buffer
+        )
+
+
+def _report(errors, line, error):
+    if len(errors) < MAX_REPORTED_ERRORS:
+        errors.append({"line": line, "error": error})
+
+
+def _insert_each(model, rows, lines, errors):
+    """Insert rows one savepoint at a time, reporting the ones the database rejects."""
+    written = []
+    for row, line in zip(rows, lines):
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(model), [row])
+            written.append(row)
+        except SQLAlchemyError as exc:
+            _report(errors, line, str(getattr(exc, "orig", None) or exc))
+    aggregates.track_rows(model, after=written)
+    db.session.commit()
+    return len(written)
+
+
+def _flush(model, rows, lines, errors):
+    # COPY goes through the raw DBAPI cursor, so its errors are not wrapped by SQLAlchemy
+    failures = (SQLAlchemyError, db.engine.dialect.loaded_dbapi.Error)
+    try:
+        _write_chunk(model, rows)
+        aggregates.track_rows(model, after=rows)
+        db.session.commit()
+        return len(rows)
+    except failures:
+        db.session.rollback()
+    # Some row broke the chunk: retry the rows one by one to keep the good ones and name the bad
+    try:
+        return _insert_each(model, rows, lines, errors)
+    except failures as exc:
+        db.session.rollback()
+        _report(errors, lines[0], f"Chunk of {len(rows)} rows rejected: {getattr(exc, 'orig', None) or exc}")
+        return 0
+
+
+def import_rows(model, validate):
+    """
+    Stream NDJSON (default) or CSV records from the request body into ``model``.
+
+    Records are parsed line by line and inserted ``?chunk_size=`` rows per
+    transaction, so memory stays bounded by the chunk size. Invalid records
+    are skipped and reported by line number. A chunk the database rejects is
+    rolled back and retried row by row, so only the offending rows are
+    skipped and reported.
+    """
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = "csv" if request.mimetype == "text/csv" else "ndjson"
+    if fmt not in ("csv", "ndjson"):
+        bad_request("format must be 'ndjson' or 'csv'")
+    chunk_size = request.args.get("chunk_size", IMPORT_CHUNK_SIZE, type=int)
+    if chunk_size < 1:
+        bad_request("chunk_size must be positive")
+    chunk_size = min(chunk_size, IMPORT_MAX_CHUNK_SIZE)
+
+    lines = codecs.iterdecode(request.stream, "utf-8")
+    records = _csv_records(lines) if fmt == "csv" else _ndjson_records(lines)
+
+    imported, failed, errors = 0, 0, []
+    explicit_ids = False
+    chunk, chunk_lines = [], []
+    for line, record, error in records:
+        if record is not None:
+            try:
+                record = _coerce(model, record) if fmt == "csv" else record
+                fields, error = validate(record)
+                if not error:
+                    fields = _passthrough(model, record, fields)
+            except ValueError as exc:
+                error = str(exc)
+        if error:
+            failed += 1
+            _report(errors, line, error)
+            continue
+
+        explicit_ids = explicit_ids or "id" in fields
+        chunk.append(fields)
+        chunk_lines.append(line)
+        if len(chunk) >= chunk_size:
+            written = _flush(model, chunk, chunk_lines, errors)
+            imported, failed = imported + written, failed + len(chunk) - written
+            chunk, chunk_lines = [], []
+
+    if chunk:
+        written = _flush(model, chunk, chunk_lines, errors)
+        imported, failed = imported + written, failed + len(chunk) - written
+
+    if explicit_ids and db.engine.dialect.name == "postgresql":
+        # Rows restored with their original ids leave the id sequence behind
+        table = model.__tablename__
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+        ))
+        db.session.commit()
+
+    return jsonify({"imported": imported, "failed": failed, "errors": errors})
@@ -0,0 +1,184 @@
+# instrumentation.py
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from database import db
+
+logger = logging.getLogger("whitlabs.sql")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    """A labelled Prometheus histogram kept in process memory."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, count, total) in sorted(self._series.items()):
+                labels = ",".join(f'{k}="{v}"' for k, v in key)
+                prefix = labels + "," if labels else ""
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {n}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+                lines.append(f"{self.name}_count{{{labels}}} {count}")
+                lines.append(f"{self.name}_sum{{{labels}}} {total:.6f}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time spent handling a request.", LATENCY_BUCKETS)
+DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per request.", LATENCY_BUCKETS)
+DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements issued per request.", QUERY_BUCKETS)
+HISTOGRAMS = [REQUEST_SECONDS, DB_SECONDS, DB_QUERIES]
+
+# Callables returning extra exposition lines for /metrics (e.g. pool gauges)
+collectors = []
+
+_slow_queries = 0
+_slow_queries_lock = threading.Lock()
+_slow_query_seconds = float(os.environ.get("SLOW_QUERY_MS", 200)) / 1000
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    global _slow_queries
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    if has_request_context() and "db_queries" in g:
+        g.db_queries += 1
+        g.db_seconds += elapsed
+    if elapsed >= _slow_query_seconds:
+        with _slow_queries_lock:
+            _slow_queries += 1
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement)
+
+
+@event.listens_for(Engine, "handle_error")
+def _query_failed(context):
+    # after_cursor_execute never runs for a failed statement; drop its start time so the
+    # next statement on this pooled connection is not timed against it
+    connection = context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def _count_rows(target, context):
+    count_rows(1)
+
+
+def count_rows(n):
+    """Add ``n`` to X-DB-Rows; for rows loaded as plain tuples, which skip the ORM load event."""
+    if has_request_context() and "db_rows" in g:
+        g.db_rows += n
+
+
+def _timed(dumps):
+    @wraps(dumps)
+    def wrapper(obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return dumps(obj, **kwargs)
+        finally:
+            if has_request_context() and "serialize_seconds" in g:
+                g.serialize_seconds += time.perf_counter() - started
+    return wrapper
+
+
+def _labels():
+    return {
+        "blueprint": request.blueprint or "app",
+        "route": request.url_rule.rule if request.url_rule else "unmatched",
+        "method": request.method
+    }
+
+
+def render_metrics():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines += [
+        "# HELP sql_slow_queries_total Statements slower than SLOW_QUERY_MS.",
+        "# TYPE sql_slow_queries_total counter",
+        f"sql_slow_queries_total {_slow_queries}"
+    ]
+    for collector in collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """
+    Time every request, count its SQL and expose the totals.
+
+    Each response carries a ``Server-Timing`` header (db, serialize, total)
+    plus ``X-DB-Queries``/``X-DB-Rows``; per-route histograms are served in
+    Prometheus text format at ``/metrics``.
+    """
+    global _slow_query_seconds
+    _slow_query_seconds = app.config.get("SLOW_QUERY_MS", _slow_query_seconds * 1000) / 1000
+    app.json.dumps = _timed(app.json.dumps)
+    if not event.contains(db.Model, "load", _count_rows):
+        event.listen(db.Model, "load", _count_rows, propagate=True)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+        g.db_rows = 0
+        g.serialize_seconds = 0.0
+
+    @app.after_request
+    def record_timings(response):
+        if "request_started" not in g:
+            return response
+        total = time.perf_counter() - g.request_started
+        labels = _labels()
+        if labels["route"] != "/metrics":
+            REQUEST_SECONDS.observe(labels, total)
+            DB_SECONDS.observe(labels, g.db_seconds)
+            DB_QUERIES.observe(labels, g.db_queries)
+        response.headers["Server-Timing"] = ", ".join([
+            f'db;dur={g.db_seconds * 1000:.2f};desc="{g.db_queries} queries"',
+            f"serialize;dur={g.serialize_seconds * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}"
+        ])
+        response.headers["X-DB-Queries"] = str(g.db_queries)
+        response.headers["X-DB-Rows"] = str(g.db_rows)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
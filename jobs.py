@@ -0,0 +1,300 @@
+# jobs.py
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from flask import jsonify, url_for
+from flask.cli import AppGroup
+from sqlalchemy import delete, or_, update
+
+import aggregates
+from cache import row_cache
+from database import db
+
+logger = logging.getLogger("whitlabs.jobs")
+
+CHUNK_SIZE = 1000
+POLL_SECONDS = 5
+STALE_SECONDS = 300
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+
+# name -> (seconds, func): housekeeping the workers run between jobs, e.g. pruning the change log
+PERIODIC = {}
+
+
+class Job(db.Model):
+    """A bulk UPDATE/DELETE run in chunks by a background worker."""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    kind = db.Column(db.String(100), nullable=False)
+    params = db.Column(db.Text, nullable=False, default="{}")
+    status = db.Column(db.String(20), nullable=False, default=QUEUED, index=True)
+    total = db.Column(db.Integer)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    # Highest row id handled so far; a resumed job continues after it
+    cursor = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # Heartbeat: bumped with every chunk, so a job whose worker died can be reclaimed
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": json.loads(self.params),
+            "status": self.status,
+            "processed": self.processed,
+            "total": self.total,
+            "progress": round(self.processed / self.total, 4) if self.total else None,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+# kind -> (model, where(params) -> condition or None, values(params) -> {column: value}, or None to delete)
+OPERATIONS = {}
+
+
+def register(kind, model, where=None, values=None):
+    """Declare a bulk operation that ``enqueue(kind, params)`` can run."""
+    OPERATIONS[kind] = (model, where, values)
+
+
+def enqueue(kind, params=None):
+    """Queue a registered operation and answer ``202 Accepted`` with the job."""
+    job = Job(kind=kind, params=json.dumps(params or {}))
+    db.session.add(job)
+    db.session.commit()
+    worker.wake()
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers["Location"] = url_for("get_job", job_id=job.id)
+    return response
+
+
+def every(name, seconds, func):
+    """Have the workers call ``func()`` in an app context at most every ``seconds``, per process."""
+    PERIODIC[name] = (seconds, func)
+
+
+def _filter(model, where, params):
+    query = model.query
+    condition = where(params) if where else None
+    return query.filter(condition) if condition is not None else query
+
+
+def _run_chunk(job_id, cursor, model, where, values, params, size):
+    """
+    Apply the operation to the next ``size`` matching rows after ``cursor`` in one transaction.
+
+    Counters, the table version and the job's progress commit together with
+    the rows, so a job interrupted at any point resumes without skipping or
+    repeating work. Returns ``(rows handled, new cursor)``.
+    """
+    # Plain column rows serve as the counter snapshots without loading ORM instances
+    before = [
+        dict(row._mapping) for row in
+        _filter(model, where, params)
+        .with_entities(*model.__table__.columns)
+        .filter(model.id > cursor)
+        .order_by(model.id)
+        .limit(size)
+    ]
+    if not before:
+        return 0, cursor
+    ids = [row["id"] for row in before]
+
+    if values is None:
+        db.session.execute(delete(model).where(model.id.in_(ids)))
+        aggregates.track_rows(model, before=before)
+    else:
+        changes = values(params)
+        db.session.execute(update(model).where(model.id.in_(ids)).values(changes))
+        aggregates.track_rows(model, before, [{**row, **changes} for row in before])
+
+    progressed = Job.query.filter_by(id=job_id, status=RUNNING).update({
+        Job.cursor: ids[-1],
+        Job.processed: Job.processed + len(ids),
+        Job.updated_at: datetime.utcnow()
+    }, synchronize_session=False)
+    if not progressed:
+        db.session.rollback()  # cancelled while this chunk ran
+        return 0, cursor
+    db.session.commit()
+    for row_id in ids:
+        row_cache.invalidate(model, row_id)
+    return len(ids), ids[-1]
+
+
+def _finish(job_id, status, error=None):
+    Job.query.filter_by(id=job_id, status=RUNNING).update({
+        Job.status: status, Job.error: error,
+        Job.finished_at: datetime.utcnow(), Job.updated_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+
+
+def run(job, size=CHUNK_SIZE):
+    """Run a claimed job to completion, cancellation or failure."""
+    model, where, values = OPERATIONS[job.kind]
+    params = json.loads(job.params)
+    job_id, cursor = job.id, job.cursor
+    try:
+        if job.total is None:
+            total = _filter(model, where, params).count()
+            Job.query.filter_by(id=job_id).update({Job.total: total}, synchronize_session=False)
+            db.session.commit()
+        while True:
+            handled, cursor = _run_chunk(job_id, cursor, model, where, values, params, size)
+            if handled < size:
+                break
+        _finish(job_id, SUCCEEDED)
+    except Exception as exc:
+        db.session.rollback()
+        logger.exception("Job %s failed", job_id)
+        _finish(job_id, FAILED, str(exc))
+
+
+def claim(stale_seconds=STALE_SECONDS):
+    """
+    Atomically take the oldest queued job, or a running one whose worker stopped.
+
+    The conditional UPDATE lets several threads and processes poll the same
+    table without running a job twice.
+    """
+    now = datetime.utcnow()
+    claimable = or_(
+        Job.status == QUEUED,
+        (Job.status == RUNNING) & (Job.updated_at < now - timedelta(seconds=stale_seconds))
+    )
+    candidates = db.session.query(Job.id).filter(claimable).order_by(Job.created_at).limit(5).all()
+    for (job_id,) in candidates:
+        claimed = Job.query.filter(Job.id == job_id, claimable).update({
+            Job.status: RUNNING,
+            Job.started_at: db.func.coalesce(Job.started_at, now),
+            Job.updated_at: now
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+    return None
+
+
+class Worker:
+    """Threads in this process that claim and run jobs; started on the first request."""
+
+    def __init__(self):
+        self.app = None
+        self.threads = []
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._last_run = {}
+
+    def init_app(self, app):
+        self.app = app
+
+    def start(self):
+        count = self.app.config.get("JOBS_WORKER_THREADS", 1)
+        with self._lock:
+            if self.threads or count < 1:
+                return
+            for i in range(count):
+                thread = threading.Thread(target=self.loop, name=f"jobs-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def wake(self):
+        self._wake.set()
+
+    def housekeeping(self):
+        """Run the ``PERIODIC`` tasks that are due; one thread claims each run."""
+        now = time.monotonic()
+        with self._lock:
+            due = [name for name, (seconds, _) in PERIODIC.items()
+                   if name not in self._last_run or now - self._last_run[name] >= seconds]
+            for name in due:
+                self._last_run[name] = now
+        for name in due:
+            try:
+                PERIODIC[name][1]()
+            except Exception:
+                db.session.rollback()
+                logger.exception("Periodic task %s failed", name)
+
+    def loop(self, once=False):
+        config = self.app.config
+        while True:
+            with self.app.app_context():
+                try:
+                    job = claim(config.get("JOBS_STALE_SECONDS", STALE_SECONDS))
+                except Exception:
+                    # e.g. the database is briefly unreachable; poll again later
+                    db.session.rollback()
+                    logger.exception("Could not claim a job")
+                    job = None
+                if job is not None:
+                    run(job, config.get("JOBS_CHUNK_SIZE", CHUNK_SIZE))
+                    continue
+                self.housekeeping()
+            if once:
+                return
+            self._wake.wait(config.get("JOBS_POLL_SECONDS", POLL_SECONDS))
+            self._wake.clear()
+
+
+worker = Worker()
+
+jobs_cli = AppGroup("jobs", help="Background job commands.")
+
+
+@jobs_cli.command("work")
+@click.option("--once", is_flag=True, help="Exit when the queue is empty.")
+def work_command(once):
+    """Run jobs in the foreground, e.g. as a dedicated worker process."""
+    worker.loop(once=once)
+
+
+def init_app(app):
+    """
+    Serve ``/jobs/<id>`` and run queued jobs on ``JOBS_WORKER_THREADS`` threads.
+
+    Workers start with the first request rather than at import, and also
+    pick up jobs left unfinished by a process that stopped. Set
+    ``JOBS_WORKER_THREADS = 0`` to leave jobs to ``flask jobs work``.
+    """
+    worker.init_app(app)
+    app.cli.add_command(jobs_cli)
+
+    @app.before_request
+    def start_workers():
+        if not worker.threads:
+            worker.start()
+
+    @app.route("/jobs/<job_id>")
+    def get_job(job_id):
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job.to_dict())
+
+    @app.route("/jobs/<job_id>", methods=["DELETE"])
+    def cancel_job(job_id):
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        if job.status in (QUEUED, RUNNING):
+            job.status = CANCELLED
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        return jsonify(job.to_dict())
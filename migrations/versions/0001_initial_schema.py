@@ -0,0 +1,57 @@
+"""Initial schema: books, tasks and notes
+
+Databases created by db.create_all() before migrations existed already have
+these tables; they are left as they are.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases from the old startup create_all() already have some or all of these
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('books'):
+        op.create_table(
+            'books',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=150), nullable=False),
+            sa.Column('author', sa.String(length=100), nullable=False),
+            sa.Column('status', sa.String(length=50), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not inspector.has_table('tasks'):
+        op.create_table(
+            'tasks',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=120), nullable=False),
+            sa.Column('description', sa.String(length=250), nullable=True),
+            sa.Column('completed', sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not inspector.has_table('notes'):
+        op.create_table(
+            'notes',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=150), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('notes')
+    op.drop_table('tasks')
+    op.drop_table('books')
@@ -0,0 +1,77 @@
+"""Running counters, stored note word counts and full-text search indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from notenest.models import count_words
+from search import index_ddl
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# Fixed here, whatever columns the models index later
+SEARCH_COLUMNS = {
+    'books': ('title', 'author'),
+    'tasks': ('title', 'description'),
+    'notes': ('title', 'content'),
+}
+
+
+def _backfill_word_counts(batch_size=1000):
+    # Before 0007 adds the change triggers, so the backfill is not streamed as note updates
+    notes = sa.table('notes', sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                     sa.column('word_count', sa.Integer))
+    conn = op.get_bind()
+    fill = notes.update().where(notes.c.id == sa.bindparam('note_id')).values(word_count=sa.bindparam('words'))
+    while True:
+        rows = conn.execute(
+            sa.select(notes.c.id, notes.c.content).where(notes.c.word_count.is_(None)).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        conn.execute(fill, [{'note_id': note_id, 'words': count_words(content)} for note_id, content in rows])
+
+
+def upgrade():
+    # Databases stamped at 0001 may already have these from the old startup create_all()
+    inspector = sa.inspect(op.get_bind())
+    if 'word_count' not in {c['name'] for c in inspector.get_columns('notes')}:
+        op.add_column('notes', sa.Column('word_count', sa.Integer(), nullable=True))
+    _backfill_word_counts()
+    if not inspector.has_table('counters'):
+        op.create_table(
+            'counters',
+            sa.Column('name', sa.String(length=150), nullable=False),
+            sa.Column('value', sa.BigInteger(), nullable=False),
+            sa.PrimaryKeyConstraint('name')
+        )
+
+    dialect = op.get_bind().dialect.name
+    for table, columns in SEARCH_COLUMNS.items():
+        for statement in index_ddl(dialect, table, columns):
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCH_COLUMNS:
+        if dialect == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        elif dialect == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{table}_search_vector')
+            op.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
+
+    op.drop_table('counters')
+    with op.batch_alter_table('notes') as batch_op:
+        batch_op.drop_column('word_count')
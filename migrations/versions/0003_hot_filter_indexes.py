@@ -0,0 +1,48 @@
+"""Indexes for the hot filter and keyset-pagination columns
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_books_author_lower', 'books', [sa.text('lower(author)')]),
+    ('ix_books_status_lower_id', 'books', [sa.text('lower(status)'), 'id']),
+    ('ix_tasks_completed_id', 'tasks', ['completed', 'id']),
+    ('ix_notes_created_at_id', 'notes', ['created_at', 'id']),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+        return
+
+    # Build without blocking writes on live tables; CONCURRENTLY cannot run in a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        # Trigram index so the ILIKE '%name%' author filters stop scanning the table
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_books_author_trgm '
+            'ON books USING gin (author gin_trgm_ops)'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_books_author_trgm')
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,33 @@
+"""Add updated_at to books, tasks and notes for conditional requests
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('books', 'tasks', 'notes'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Existing rows count as modified now; notes already know when they were written
+    op.execute("UPDATE books SET updated_at = CURRENT_TIMESTAMP")
+    op.execute("UPDATE tasks SET updated_at = CURRENT_TIMESTAMP")
+    op.execute("UPDATE notes SET updated_at = coalesce(created_at, CURRENT_TIMESTAMP)")
+
+
+def downgrade():
+    # A plain DROP COLUMN (SQLite 3.35+) keeps the full-text triggers that a
+    # batch table rebuild would lose
+    for table in ('notes', 'tasks', 'books'):
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,36 @@
+"""Add the author_counts summary table behind the top-authors leaderboard
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'author_counts',
+        sa.Column('author', sa.String(length=100), nullable=False),
+        sa.Column('book_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('author')
+    )
+    op.create_index('ix_author_counts_rank', 'author_counts', ['book_count', 'author'])
+    # Writes only adjust existing counts, so start from the current books
+    op.execute(
+        "INSERT INTO author_counts (author, book_count) "
+        "SELECT author, COUNT(*) FROM books GROUP BY author"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_author_counts_rank', table_name='author_counts')
+    op.drop_table('author_counts')
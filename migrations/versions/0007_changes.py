@@ -0,0 +1,57 @@
+"""Add the changes log behind the /changes event streams, filled by triggers
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from changes import trigger_ddl
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+# Fixed here, whatever tables later register a feed
+TABLES = ('books', 'tasks', 'notes')
+TRIGGER_SUFFIXES = ('ai', 'au', 'ad')
+OPS = ('create', 'update', 'delete')
+
+
+def upgrade():
+    op.create_table(
+        'changes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('table_name', sa.String(length=50), nullable=False),
+        sa.Column('row_id', sa.Integer(), nullable=False),
+        sa.Column('op', sa.String(length=6), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True
+    )
+    op.create_index('ix_changes_created_at', 'changes', ['created_at'])
+
+    # Existing rows are not replayed: the log starts empty, at sequence number 0
+    for statement in trigger_ddl(op.get_bind().dialect.name, TABLES):
+        op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        for suffix in TRIGGER_SUFFIXES:
+            if dialect == 'sqlite':
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_changes_{suffix}')
+            elif dialect == 'postgresql':
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_changes_{suffix} ON {table}')
+    if dialect == 'postgresql':
+        for kind in OPS:
+            op.execute(f'DROP FUNCTION IF EXISTS changes_after_{kind}()')
+
+    op.drop_index('ix_changes_created_at', table_name='changes')
+    op.drop_table('changes')
@@ -0,0 +1,50 @@
+"""Build the running counters of tables that do not have them yet
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+# table -> queries yielding (counter name, value), as each model's recount() computes them
+COUNTERS = {
+    'books': (
+        "SELECT 'books.total', COUNT(*) FROM books",
+        "SELECT 'books.status.' || status, COUNT(*) FROM books GROUP BY status",
+    ),
+    'tasks': (
+        "SELECT 'tasks.total', COUNT(*) FROM tasks",
+        "SELECT 'tasks.completed', COUNT(*) FROM tasks WHERE completed",
+    ),
+    'notes': (
+        "SELECT 'notes.total', COUNT(*) FROM notes",
+        "SELECT 'notes.words', COALESCE(SUM(word_count), 0) FROM notes",
+        "SELECT 'notes.chars', COALESCE(SUM(LENGTH(content)), 0) FROM notes",
+    ),
+}
+
+
+def upgrade():
+    # Writes only adjust existing counters, and stats reads never build them
+    conn = op.get_bind()
+    for table, queries in COUNTERS.items():
+        built = conn.execute(sa.text("SELECT 1 FROM counters WHERE name = :name"),
+                             {'name': f'{table}.total'}).first()
+        if built:
+            continue
+        for query in queries:
+            op.execute(f"INSERT INTO counters (name, value) {query}")
+
+
+def downgrade():
+    # The counters stay valid, and 0002 drops the table they live in
+    pass
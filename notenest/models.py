@@ -1,13 +1,23 @@
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import validates
 from database import db
+from search import full_text_index
+from changes import change_feed
 
 class Note(db.Model):
     __tablename__ = 'notes'
+    # The keys of to_dict(), selected as plain columns by list and export routes
+    FIELDS = ("id", "title", "content", "created_at")
+    # What list routes return unless ?fields= asks for more
+    LIST_FIELDS = ("id", "title", "created_at")
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(150), nullable=False)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    word_count = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def to_dict(self):
         return {
@@ -16,3 +26,35 @@ class Note(db.Model):
             "content": self.content,
             "created_at": self.created_at.isoformat()
         }
+
+    @validates('content')
+    def _store_word_count(self, key, content):
+        # Stored at write time so word statistics never have to re-read content
+        self.word_count = count_words(content)
+        return content
+
+    @staticmethod
+    def counts(row):
+        """Counter deltas contributed by one note (see aggregates.py)."""
+        return {"total": 1, "words": row['word_count'] or 0, "chars": len(row['content'] or '')}
+
+    @classmethod
+    def recount(cls):
+        """Recompute the note counters with a single aggregate query."""
+        total, words, chars = db.session.query(
+            func.count(cls.id),
+            func.coalesce(func.sum(cls.word_count), 0),
+            func.coalesce(func.sum(func.length(cls.content)), 0)
+        ).one()
+        return {"total": total, "words": words, "chars": chars}
+
+
+def count_words(content):
+    return len(content.split()) if content else 0
+
+
+full_text_index(Note, "title", "content")
+change_feed(Note)
+
+# Mirrored by migrations/versions/0003_hot_filter_indexes.py
+db.Index("ix_notes_created_at_id", Note.created_at, Note.id)
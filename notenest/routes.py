@@ -1,8 +1,19 @@
 from flask import Blueprint, request, jsonify
-from .models import db, Note
+from .models import db, Note, count_words
 from sqlalchemy import func
+from pagination import paginate_records
+from streaming import stream_export
+from importer import import_rows
+from search import text_search
+from sampling import random_rows, sample_size
+import aggregates
+from cache import row_cache
+from conditional import conditional
+from admission import cost, long_lived
+import batch
+import changes
+import jobs
 from datetime import datetime, timedelta
-import random 
 
 notenest_bp = Blueprint('notenest', __name__)
 
@@ -12,41 +23,61 @@ def home():
         "message": "Welcome to NoteNest API 📝",
         "endpoints": [
             "/notes (GET, POST)",
-            "/notes/<id> (GET, PUT, DELETE)"
+            "/notes/<id> (GET, PUT, DELETE)",
+            "/changes (GET, text/event-stream)"
         ]
     })
 
 
+def _note_fields(data, partial=False):
+    """Validate a note payload; returns ``(fields, error)``."""
+    if partial:
+        fields = {key: data[key] for key in ('title', 'content') if key in data}
+        if not all(fields.values()):
+            return None, "Title and content cannot be empty"
+    elif not data.get('title') or not data.get('content'):
+        return None, "Both title and content are required"
+    else:
+        fields = {"title": data['title'], "content": data['content']}
+    # Bulk statements bypass the model's validator, so keep word_count in step here
+    if 'content' in fields:
+        fields['word_count'] = count_words(fields['content'])
+    return fields, None
+
+
 # --- CREATE ---
 @notenest_bp.route('/notes', methods=['POST'])
 def create_note():
-    data = request.get_json()
-    title = data.get('title')
-    content = data.get('content')
-
-    if not title or not content:
-        return jsonify({"error": "Both title and content are required"}), 400
+    fields, error = _note_fields(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
 
-    new_note = Note(title=title, content=content)
+    new_note = Note(title=fields['title'], content=fields['content'])
     db.session.add(new_note)
+    aggregates.track(Note, after=aggregates.snapshot(new_note))
     db.session.commit()
     return jsonify(new_note.to_dict()), 201
 
 
 # --- READ ALL ---
 @notenest_bp.route('/notes', methods=['GET'])
+@conditional(Note)
 def get_notes():
-    notes = Note.query.order_by(Note.created_at.desc()).all()
-    return jsonify([note.to_dict() for note in notes])
+    notes, next_cursor = paginate_records(Note, Note.query, Note.created_at, Note.id, descending=True)
+    return jsonify({
+        "notes": notes,
+        "next_cursor": next_cursor
+    })
 
 
 # --- READ ONE ---
 @notenest_bp.route('/notes/<int:note_id>', methods=['GET'])
+@conditional()
 def get_note(note_id):
-    note = Note.query.get(note_id)
-    if not note:
+    payload = row_cache.fetch(Note, note_id)
+    if payload is None:
         return jsonify({"error": "Note not found"}), 404
-    return jsonify(note.to_dict())
+    return jsonify(payload)
 
 
 # --- UPDATE ---
@@ -57,9 +88,12 @@ def update_note(note_id):
         return jsonify({"error": "Note not found"}), 404
 
     data = request.get_json()
+    before = aggregates.snapshot(note)
     note.title = data.get('title', note.title)
     note.content = data.get('content', note.content)
+    aggregates.track(Note, before, aggregates.snapshot(note))
     db.session.commit()
+    row_cache.invalidate(Note, note_id)
 
     return jsonify(note.to_dict())
 
@@ -71,18 +105,42 @@ def delete_note(note_id):
     if not note:
         return jsonify({"error": "Note not found"}), 404
 
+    aggregates.track(Note, before=aggregates.snapshot(note))
     db.session.delete(note)
     db.session.commit()
+    row_cache.invalidate(Note, note_id)
     return jsonify({"message": f"Note {note_id} deleted successfully"})
 
-# --- 1. Search notes by title or content ---
+# --- BATCH CREATE / UPDATE / DELETE ---
+@notenest_bp.route('/notes/batch', methods=['POST'])
+@cost(5)
+def create_notes_batch():
+    return batch.create(Note, request.get_json(), _note_fields)
+
+
+@notenest_bp.route('/notes/batch', methods=['PATCH'])
+@cost(5)
+def update_notes_batch():
+    return batch.update_many(Note, request.get_json(), _note_fields)
+
+
+@notenest_bp.route('/notes/batch', methods=['DELETE'])
+@cost(5)
+def delete_notes_batch():
+    return batch.delete_many(Note, request.get_json())
+
+
+# --- 1. Search notes by title or content (full-text, ranked) ---
 @notenest_bp.route('/notes/search')
+@cost(2)
+@conditional(Note)
 def search_notes():
     query = request.args.get('q', '')
-    results = Note.query.filter(
-        (Note.title.ilike(f"%{query}%")) | (Note.content.ilike(f"%{query}%"))
-    ).all()
-    return jsonify([note.to_dict() for note in results])
+    results, next_cursor = paginate_records(Note, *text_search(Note, query, Note.title, Note.content))
+    return jsonify({
+        "notes": results,
+        "next_cursor": next_cursor
+    })
 
 
 # --- 2. Get recent notes (created in last X days) ---
@@ -90,56 +148,77 @@ def search_notes():
 def recent_notes():
     days = int(request.args.get('days', 7))
     cutoff = datetime.utcnow() - timedelta(days=days)
-    notes = Note.query.filter(Note.created_at >= cutoff).order_by(Note.created_at.desc()).all()
-    return jsonify([note.to_dict() for note in notes])
+    notes, next_cursor = paginate_records(
+        Note, Note.query.filter(Note.created_at >= cutoff), Note.created_at, Note.id, descending=True
+    )
+    return jsonify({
+        "notes": notes,
+        "next_cursor": next_cursor
+    })
 
 
 # --- 3. Sort notes (asc or desc) ---
 @notenest_bp.route('/notes/sorted')
+@conditional(Note)
 def sorted_notes():
     order = request.args.get('order', 'desc')
-    if order == 'asc':
-        notes = Note.query.order_by(Note.created_at.asc()).all()
-    else:
-        notes = Note.query.order_by(Note.created_at.desc()).all()
-    return jsonify([note.to_dict() for note in notes])
+    notes, next_cursor = paginate_records(
+        Note, Note.query, Note.created_at, Note.id, descending=(order != 'asc')
+    )
+    return jsonify({
+        "notes": notes,
+        "next_cursor": next_cursor
+    })
 
 
 # --- 4. Get word count for all notes ---
 @notenest_bp.route('/notes/wordcount')
+@cost(2)
+@conditional(Note)
 def note_wordcount():
-    notes = Note.query.all()
-    total_words = sum(len(note.content.split()) for note in notes)
+    counts = aggregates.totals(Note)
+    count = counts.get("total", 0)
+    total_words = counts.get("words", 0)
     return jsonify({
-        "note_count": len(notes),
+        "note_count": count,
         "total_words": total_words,
-        "average_words": total_words / len(notes) if notes else 0
+        "average_words": total_words / count if count else 0
     })
 
 
-# --- 5. Delete all notes ---
+# Table-wide deletes run as chunked background jobs (see jobs.py)
+jobs.register("notenest.delete", Note,
+              where=lambda p: Note.created_at < datetime.fromisoformat(p['before']) if 'before' in p else None)
+
+
+# --- 5. Delete all notes (202 + job) ---
 @notenest_bp.route('/notes/clear_all', methods=['DELETE'])
+@cost(5)
 def clear_all_notes():
-    deleted = Note.query.delete()
-    db.session.commit()
-    return jsonify({"message": f"{deleted} notes deleted"})
+    return jobs.enqueue("notenest.delete")
 
 
-# --- 6. Get a random note ---
+# --- 6. Get a random note (or ?n= random notes) ---
 @notenest_bp.route('/notes/random')
+@cost(5)
 def random_note():
-    notes = Note.query.all()
+    n = sample_size()
+    notes = random_rows(Note, n or 1)
     if not notes:
         return jsonify({"message": "No notes found"}), 404
-    return jsonify(random.choice(notes).to_dict())
+    if n is not None:
+        return jsonify({"notes": [note.to_dict() for note in notes]})
+    return jsonify(notes[0].to_dict())
 
 
 # --- 7. Get notes summary (count + average length) ---
 @notenest_bp.route('/notes/summary')
+@cost(2)
+@conditional(Note)
 def note_summary():
-    notes = Note.query.all()
-    count = len(notes)
-    total_chars = sum(len(note.content) for note in notes)
+    counts = aggregates.totals(Note)
+    count = counts.get("total", 0)
+    total_chars = counts.get("chars", 0)
     avg_length = total_chars / count if count else 0
     return jsonify({
         "note_count": count,
@@ -150,26 +229,42 @@ def note_summary():
 
 # --- 8. Get notes containing a keyword ---
 @notenest_bp.route('/notes/contains/<string:keyword>')
+@conditional(Note)
 def notes_containing(keyword):
-    results = Note.query.filter(Note.content.ilike(f"%{keyword}%")).all()
-    return jsonify([note.to_dict() for note in results])
+    results, next_cursor = paginate_records(Note, *text_search(Note, keyword, Note.content))
+    return jsonify({
+        "notes": results,
+        "next_cursor": next_cursor
+    })
 
 
-# --- 9. Delete notes older than X days ---
+# --- 9. Delete notes older than X days (202 + job) ---
 @notenest_bp.route('/notes/cleanup', methods=['DELETE'])
+@cost(5)
 def cleanup_old_notes():
     days = int(request.args.get('days', 30))
     cutoff = datetime.utcnow() - timedelta(days=days)
-    deleted = Note.query.filter(Note.created_at < cutoff).delete()
-    db.session.commit()
-    return jsonify({"message": f"{deleted} old notes deleted"})
+    # The cutoff is fixed now, not when the job gets to run
+    return jobs.enqueue("notenest.delete", {"before": cutoff.isoformat()})
 
 
 # --- 10. Export all notes as JSON ---
 @notenest_bp.route('/notes/export')
+@cost(20)
+@conditional(Note)
 def export_notes():
-    notes = Note.query.all()
-    return jsonify({
-        "exported_count": len(notes),
-        "notes": [note.to_dict() for note in notes]
-    })
+    return stream_export(Note.query.order_by(Note.id), "notes")
+
+
+# --- 11. Import notes from NDJSON or CSV (counterpart to export) ---
+@notenest_bp.route('/notes/import', methods=['POST'])
+@cost(20)
+def import_notes():
+    return import_rows(Note, _note_fields)
+
+
+# --- 12. Live feed of note changes (Server-Sent Events), resumable with Last-Event-ID or ?since= ---
+@notenest_bp.route('/changes')
+@long_lived
+def note_changes():
+    return changes.stream(Note)
@@ -0,0 +1,151 @@
+# pagination.py
+import base64
+import json
+from datetime import datetime
+
+from flask import request, jsonify, abort
+from sqlalchemy import tuple_
+
+from instrumentation import count_rows
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def encode_cursor(values):
+    """Turn the sort-key values of the last row into an opaque cursor string."""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _cursor_value(value, column):
+    """Convert one decoded cursor value for ``column``; ``ValueError`` if it does not fit its type."""
+    # Keyset bounds are compared with < and >, which NULL never satisfies
+    if value is None:
+        raise ValueError(value)
+    try:
+        expected = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        expected = object
+    if expected is object:
+        # An untyped expression, e.g. a search rank: any JSON scalar will do
+        if isinstance(value, (dict, list)):
+            raise ValueError(value)
+        return value
+    if expected is datetime:
+        if not isinstance(value, str):
+            raise ValueError(value)
+        return datetime.fromisoformat(value)
+    if expected is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    # bool is an int subclass, so check exact types
+    if type(value) is not expected:
+        raise ValueError(value)
+    return value
+
+
+def decode_cursor(cursor, columns):
+    """Inverse of ``encode_cursor``; returns ``None`` if the cursor is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            return None
+        return [_cursor_value(v, col) for v, col in zip(values, columns)]
+    except (ValueError, TypeError):
+        return None
+
+
+def bad_request(message):
+    """Abort the current request with a JSON 400 error."""
+    response = jsonify({"error": message})
+    response.status_code = 400
+    abort(response)
+
+
+def page_limit():
+    """Read ``?limit=`` from the request, clamped to ``MAX_LIMIT``."""
+    try:
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        bad_request("limit must be an integer")
+    if limit < 1:
+        bad_request("limit must be positive")
+    return min(limit, MAX_LIMIT)
+
+
+def paginate(query, *columns, descending=False):
+    """
+    Keyset-paginate ``query`` on ``columns`` (which must end with a unique column).
+
+    Reads ``?limit=`` and ``?after=`` from the request and returns
+    ``(rows, next_cursor)``; ``next_cursor`` is ``None`` on the last page.
+    The sort keys are selected alongside the row so any expression
+    (including a search rank) can be used as a key.
+    """
+    limit = page_limit()
+    after = request.args.get("after")
+    key = tuple_(*columns) if len(columns) > 1 else columns[0]
+
+    if after:
+        values = decode_cursor(after, columns)
+        if values is None:
+            bad_request("Invalid cursor")
+        bound = tuple_(*values) if len(columns) > 1 else values[0]
+        query = query.filter(key < bound if descending else key > bound)
+
+    width = len(query.column_descriptions)
+    order = [col.desc() if descending else col.asc() for col in columns]
+    rows = (
+        query.add_columns(*[col.label(f"_cursor_{i}") for i, col in enumerate(columns)])
+        .order_by(None)
+        .order_by(*order)
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(rows[-1][width:]))
+
+    items = [row[0] if width == 1 else row[:width] for row in rows]
+    return items, next_cursor
+
+
+def requested_fields(model, default):
+    """
+    Parse ``?fields=title,content`` against ``model``'s columns.
+
+    ``id`` is always included and ``*`` selects every ``to_dict()`` key;
+    without the parameter ``default`` is returned.
+    """
+    raw = request.args.get("fields")
+    if not raw:
+        return default
+    if raw.strip() == "*":
+        return model.FIELDS
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    columns = model.__table__.columns
+    unknown = [name for name in names if name not in columns]
+    if unknown:
+        bad_request(f"Unknown field(s): {', '.join(unknown)}; choose from {', '.join(columns.keys())}")
+    return ("id",) + tuple(dict.fromkeys(name for name in names if name != "id"))
+
+
+def paginate_records(model, query, *columns, descending=False):
+    """
+    Like ``paginate``, but select only the requested fields and return plain dicts.
+
+    Fields default to ``model.LIST_FIELDS`` (see ``requested_fields``), so
+    large text columns are never read unless asked for. Rows come back as
+    tuples rather than ORM instances, skipping identity-map bookkeeping and
+    ``to_dict()`` for every row on the page.
+    """
+    fields = requested_fields(model, model.LIST_FIELDS)
+    query = query.with_entities(*[getattr(model, name) for name in fields])
+    rows, next_cursor = paginate(query, *columns, descending=descending)
+    count_rows(len(rows))
+    if len(fields) == 1:
+        rows = [(row,) for row in rows]
+    return [dict(zip(fields, row)) for row in rows], next_cursor
@@ -0,0 +1,230 @@
+# pooling.py
+import os
+import threading
+import time
+import weakref
+
+from flask import has_request_context, jsonify, request
+from sqlalchemy import event, exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+from database import db
+import instrumentation
+
+# Requests that only read; everything else, including CLI commands and job
+# workers, takes SQLite's write lock when its transaction begins
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+CHECKOUT_SECONDS = instrumentation.Histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a pooled connection.", CHECKOUT_BUCKETS)
+
+_invalidations = 0
+
+# Held by the thread whose SQLite write transaction is open in this process
+_sqlite_write_lock = threading.Lock()
+
+
+def _reset_sqlite_write_lock():
+    # A fork copies the lock as it was, possibly held by a thread the child does not have
+    global _sqlite_write_lock
+    _sqlite_write_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_sqlite_write_lock)
+
+
+class _TimedCheckout:
+    """Records how long each connection checkout took, including any wait for a free slot."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            CHECKOUT_SECONDS.observe({}, time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, str(default)).lower() in ("1", "true", "yes")
+
+
+def engine_options(db_url):
+    """
+    Build ``SQLALCHEMY_ENGINE_OPTIONS`` for ``db_url`` from ``DB_*`` environment variables.
+
+    Only PostgreSQL is configured here; SQLite is tuned per connection by
+    ``init_app`` (see ``sqlite_pragmas``). The pool is
+    per process, so ``DB_POOL_SIZE`` defaults to the gunicorn thread count.
+    ``DB_EXTERNAL_POOLER=true`` (e.g. PgBouncer) opens one connection per
+    checkout and leaves pooling to the external pooler.
+    """
+    if not db_url.startswith("postgresql"):
+        return {}
+
+    options = {"pool_pre_ping": _env_flag("DB_POOL_PRE_PING", True)}
+    if _env_flag("DB_EXTERNAL_POOLER", False):
+        # Session settings would leak between clients in transaction pooling
+        # mode, so set statement_timeout on the database role instead
+        options["poolclass"] = TimedNullPool
+        return options
+
+    options.update({
+        "poolclass": TimedQueuePool,
+        "pool_size": _env_int("DB_POOL_SIZE", os.environ.get("GUNICORN_THREADS", 5)),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        # Drop connections before server-side idle timeouts or failovers can kill them
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+    })
+    statement_timeout = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+    if statement_timeout:
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    return options
+
+
+def sqlite_pragmas():
+    """
+    PRAGMAs run on every new SQLite connection, from ``SQLITE_*`` environment variables.
+
+    WAL lets readers carry on while a write commits, and ``synchronous=NORMAL``
+    is durable in WAL mode except for the last commits before a power loss.
+    ``SQLITE_TUNING=false`` leaves SQLite's defaults alone.
+    """
+    if not _env_flag("SQLITE_TUNING", True):
+        return {}
+    return {
+        # First, so the journal mode switch below waits out other connections too
+        "busy_timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+        "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        # Negative sizes are in KiB; the page cache is per connection
+        "cache_size": -_env_int("SQLITE_CACHE_SIZE_KB", 16384),
+        "mmap_size": _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+        "temp_store": "MEMORY",
+    }
+
+
+def _immediate_writes():
+    return _env_flag("SQLITE_TUNING", True) and _env_flag("SQLITE_IMMEDIATE_WRITES", True)
+
+
+def _sqlite_connect(dbapi_connection, connection_record):
+    if _immediate_writes():
+        # Stop the driver from issuing its own BEGIN; _sqlite_begin does it instead
+        dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    for name, value in sqlite_pragmas().items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def _sqlite_begin(conn):
+    # A transaction that starts as a reader and then writes can fail with "database
+    # is locked" on the upgrade, whatever the busy timeout. BEGIN IMMEDIATE takes
+    # the write lock up front, so writers from every worker wait their turn instead
+    if has_request_context() and request.method in SAFE_METHODS:
+        conn.exec_driver_sql("BEGIN")
+        return
+    # Writers in this process queue on a lock rather than in SQLite's busy
+    # handler, which polls with sleeps of up to 100 ms; other processes still
+    # wait in the busy handler. Past the timeout, fall through to SQLite.
+    timeout = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000
+    lock = _sqlite_write_lock
+    if lock.acquire(timeout=timeout):
+        conn.info["sqlite_write_lock"] = lock
+    try:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    except Exception:
+        _sqlite_end(conn)
+        raise
+
+
+def _sqlite_end(conn):
+    lock = conn.info.pop("sqlite_write_lock", None)
+    if lock is not None:
+        lock.release()
+
+
+def _dispose_after_fork(engine_ref):
+    engine = engine_ref()
+    if engine is not None:
+        # close=False: the parent still owns those sockets and file handles
+        engine.dispose(close=False)
+
+
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    global _invalidations
+    _invalidations += 1
+
+
+def pool_metrics():
+    """Prometheus lines describing this process's connection pool."""
+    pool = db.engine.pool
+    lines = CHECKOUT_SECONDS.render()
+    lines += [
+        "# HELP db_pool_invalidations_total Connections discarded as stale or broken.",
+        "# TYPE db_pool_invalidations_total counter",
+        f"db_pool_invalidations_total {_invalidations}"
+    ]
+    if isinstance(pool, QueuePool):
+        for name, help_text, value in (
+            ("size", "Configured number of pooled connections.", pool.size()),
+            ("checked_out", "Connections currently in use.", pool.checkedout()),
+            ("checked_in", "Idle connections held by the pool.", pool.checkedin()),
+            ("overflow", "Connections open beyond pool_size.", max(0, pool.overflow())),
+        ):
+            lines += [
+                f"# HELP db_pool_{name} {help_text}",
+                f"# TYPE db_pool_{name} gauge",
+                f"db_pool_{name} {value}"
+            ]
+    return lines
+
+
+def init_app(app):
+    """
+    Export pool statistics on ``/metrics`` and turn pool exhaustion into a 503.
+
+    On SQLite, also apply ``sqlite_pragmas`` to each connection and begin
+    transactions outside safe requests with ``BEGIN IMMEDIATE``.
+    """
+    with app.app_context():
+        engines = list(db.engines.values())
+    # Replica binds (see replicas.py) get the same per-connection setup as the primary
+    for engine in engines:
+        pool = engine.pool
+        if engine.dialect.name == "sqlite" and not event.contains(engine, "connect", _sqlite_connect):
+            event.listen(engine, "connect", _sqlite_connect)
+            if _immediate_writes():
+                event.listen(engine, "begin", _sqlite_begin)
+                event.listen(engine, "commit", _sqlite_end)
+                event.listen(engine, "rollback", _sqlite_end)
+        if not event.contains(pool, "invalidate", _on_invalidate):
+            event.listen(pool, "invalidate", _on_invalidate)
+            # A forked child (gunicorn --preload, multiprocessing) opens its own connections
+            engine_ref = weakref.ref(engine)
+            os.register_at_fork(after_in_child=lambda engine_ref=engine_ref: _dispose_after_fork(engine_ref))
+    if pool_metrics not in instrumentation.collectors:
+        instrumentation.collectors.append(pool_metrics)
+
+    @app.errorhandler(exc.TimeoutError)
+    def pool_exhausted(error):
+        db.session.rollback()
+        response = jsonify({"error": "Database is busy, try again shortly"})
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+        return response
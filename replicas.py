@@ -0,0 +1,227 @@
+# replicas.py
+import itertools
+import logging
+import os
+import threading
+import time
+
+from flask import g, has_app_context, request
+from sqlalchemy import event, text
+
+from database import db
+import instrumentation
+
+logger = logging.getLogger("whitlabs.replicas")
+
+BIND_PREFIX = "replica_"
+# Only these blueprints read from replicas; /jobs, /metrics and the CLI stay on the primary
+BLUEPRINTS = ("bookify", "taskflow", "notenest")
+READ_METHODS = frozenset(("GET", "HEAD"))
+
+DEFAULTS = {
+    # Seconds a client's reads stay on the primary after one of its writes
+    "REPLICA_STICKY_SECONDS": 5.0,
+    # How often a replica is probed, and how long one that failed is left alone
+    "REPLICA_CHECK_SECONDS": 5.0,
+    # PostgreSQL only: replicas replaying further behind than this are skipped; 0 disables
+    "REPLICA_MAX_LAG_SECONDS": 10.0,
+    "REPLICA_COOKIE": "read_primary_until",
+    # The same deadline as a response header, for clients without cookies to send back
+    "REPLICA_HEADER": "X-Read-Primary-Until",
+}
+
+# PostgreSQL only: how long opening a replica connection may take, so a dead host fails fast
+CONNECT_TIMEOUT_SECONDS = 2
+
+_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def replica_urls():
+    """``DATABASE_REPLICA_URLS``: comma-separated read-only copies of ``DATABASE_URL``."""
+    urls = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    # Same old-style scheme fix as DATABASE_URL
+    return [url.replace("postgres://", "postgresql://", 1) if url.startswith("postgres://") else url
+            for url in urls]
+
+
+def _options(url, engine_options):
+    options = engine_options(url)
+    if url.startswith("postgresql"):
+        timeout = int(os.environ.get("REPLICA_CONNECT_TIMEOUT", CONNECT_TIMEOUT_SECONDS))
+        options["connect_args"] = {**options.get("connect_args", {}), "connect_timeout": timeout}
+    return options
+
+
+def binds(urls, engine_options):
+    """
+    ``SQLALCHEMY_BINDS`` entries for ``urls``; ``engine_options(url)`` builds each engine's options.
+
+    PostgreSQL replicas also get a ``connect_timeout`` of ``REPLICA_CONNECT_TIMEOUT`` seconds.
+    """
+    return {f"{BIND_PREFIX}{i}": {"url": url, **_options(url, engine_options)} for i, url in enumerate(urls)}
+
+
+class Replica:
+    def __init__(self, key, engine):
+        self.key = key
+        self.engine = engine
+        self.healthy = True
+        self.checked = 0.0
+        self.reads = 0
+        self._checking = threading.Lock()
+
+
+class ReplicaRouter:
+    """Hands out healthy replicas in turn, probing each at most every ``interval`` seconds."""
+
+    def __init__(self):
+        self.configure([])
+
+    def configure(self, engines, interval=5.0, max_lag=0.0):
+        self.replicas = [Replica(key, engine) for key, engine in engines]
+        self.interval = interval
+        self.max_lag = max_lag
+        self._turn = itertools.count()
+
+    def check(self, replica):
+        """Probe ``replica`` in the background unless a probe is already running; keeps the last verdict meanwhile."""
+        if not replica._checking.acquire(blocking=False):
+            return
+        # Requests never wait on a probe, however slow the replica is to answer
+        threading.Thread(target=self._probe, args=(replica,), name=f"probe-{replica.key}", daemon=True).start()
+
+    def _probe(self, replica):
+        try:
+            healthy = True
+            try:
+                with replica.engine.connect() as conn:
+                    if replica.engine.dialect.name == "postgresql" and self.max_lag:
+                        lag = conn.execute(_LAG_QUERY).scalar()
+                        healthy = lag is None or lag <= self.max_lag
+                        if not healthy:
+                            logger.warning("Replica %s is %.1f s behind", replica.key, lag)
+                    else:
+                        conn.execute(text("SELECT 1"))
+            except Exception as exc:
+                healthy = False
+                logger.warning("Replica %s is unreachable: %s", replica.key, exc)
+            if healthy and not replica.healthy:
+                logger.info("Replica %s is back", replica.key)
+            replica.healthy = healthy
+            replica.checked = time.monotonic()
+        finally:
+            replica._checking.release()
+
+    def mark_down(self, engine):
+        for replica in self.replicas:
+            if replica.engine is engine:
+                replica.healthy = False
+                replica.checked = time.monotonic()
+
+    def choose(self):
+        """The next healthy replica's engine, or ``None`` to read from the primary."""
+        if not self.replicas:
+            return None
+        start = next(self._turn)
+        now = time.monotonic()
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if now - replica.checked >= self.interval:
+                self.check(replica)
+            if replica.healthy:
+                replica.reads += 1
+                return replica.engine
+        return None
+
+
+router = ReplicaRouter()
+
+
+def use_primary():
+    """Send the rest of this request's reads to the primary, e.g. before deriving data to store."""
+    if has_app_context():
+        g.pop("read_engine", None)
+
+
+def on_replica():
+    return has_app_context() and "read_engine" in g
+
+
+def replica_metrics():
+    lines = [
+        "# HELP db_replica_up Whether the replica passed its last health check.",
+        "# TYPE db_replica_up gauge",
+    ]
+    lines += [f'db_replica_up{{replica="{r.key}"}} {int(r.healthy)}' for r in router.replicas]
+    lines += [
+        "# HELP db_replica_reads_total Requests whose reads were sent to the replica.",
+        "# TYPE db_replica_reads_total counter",
+    ]
+    lines += [f'db_replica_reads_total{{replica="{r.key}"}} {r.reads}' for r in router.replicas]
+    return lines
+
+
+def _on_error(context):
+    # Failed mid-request: later requests skip this replica until its next check
+    if context.is_disconnect or context.connection is None:
+        router.mark_down(context.engine)
+
+
+def init_app(app):
+    """
+    Route reads in the blueprints to replicas configured as ``replica_*`` binds.
+
+    ``GET``/``HEAD`` requests pick one healthy replica in round-robin and
+    run their SELECTs on it; writes, and any read after a write in the same
+    request, go to the primary. A successful write sets a cookie that keeps
+    that client's reads on the primary for ``REPLICA_STICKY_SECONDS``, so it
+    sees its own changes despite replication lag; the same deadline goes out
+    in the ``REPLICA_HEADER`` response header, for clients without cookies
+    to send back on their next requests. Without replicas this does nothing.
+    """
+    for name, default in DEFAULTS.items():
+        value = os.environ.get(name)
+        app.config.setdefault(name, type(default)(value) if value is not None else default)
+
+    with app.app_context():
+        engines = [(key, engine) for key, engine in db.engines.items()
+                   if key and key.startswith(BIND_PREFIX)]
+    router.configure(engines, app.config["REPLICA_CHECK_SECONDS"], app.config["REPLICA_MAX_LAG_SECONDS"])
+    if not engines:
+        return
+
+    for _, engine in engines:
+        if not event.contains(engine, "handle_error", _on_error):
+            event.listen(engine, "handle_error", _on_error)
+    if replica_metrics not in instrumentation.collectors:
+        instrumentation.collectors.append(replica_metrics)
+
+    cookie, header = app.config["REPLICA_COOKIE"], app.config["REPLICA_HEADER"]
+
+    @app.before_request
+    def pick_replica():
+        if request.method not in READ_METHODS or request.blueprint not in BLUEPRINTS:
+            return
+        try:
+            sticky_until = float(request.headers.get(header) or request.cookies.get(cookie, 0))
+        except ValueError:
+            sticky_until = 0
+        if sticky_until > time.time():
+            return
+        engine = router.choose()
+        if engine is not None:
+            g.read_engine = engine
+
+    @app.after_request
+    def stick_to_primary(response):
+        if request.method in READ_METHODS or request.blueprint not in BLUEPRINTS or response.status_code >= 400:
+            return response
+        window = app.config["REPLICA_STICKY_SECONDS"]
+        if window > 0:
+            until = f"{time.time() + window:.3f}"
+            response.set_cookie(cookie, until, max_age=int(window) + 1, httponly=True, samesite="Lax")
+            response.headers[header] = until
+        return response
@@ -0,0 +1,84 @@
+# sampling.py
+import random
+import time
+
+from flask import request
+from sqlalchemy import func
+
+from database import db
+from pagination import bad_request
+
+MAX_SAMPLE = 100
+ID_RANGE_TTL = 30  # seconds a cached (min id, max id) pair stays fresh
+MAX_ROUNDS = 5
+
+# tablename -> (min_id, max_id, fetched_at)
+_id_ranges = {}
+
+
+def _id_range(model, refresh=False):
+    """Return the cached ``(min, max)`` primary key of ``model``; both ends are index lookups."""
+    cached = _id_ranges.get(model.__tablename__)
+    if cached and not refresh and time.monotonic() - cached[2] < ID_RANGE_TTL:
+        return cached[0], cached[1]
+    low, high = db.session.query(func.min(model.id), func.max(model.id)).one()
+    if low is not None:
+        _id_ranges[model.__tablename__] = (low, high, time.monotonic())
+    return low, high
+
+
+def _seek(model, low, high):
+    """Fetch the first row at or after a random id, wrapping around to the start."""
+    target = random.randint(low, high)
+    row = model.query.filter(model.id >= target).order_by(model.id).first()
+    return row or model.query.filter(model.id >= low).order_by(model.id).first()
+
+
+def random_rows(model, n=1):
+    """
+    Pick up to ``n`` distinct random rows of ``model`` without scanning the table.
+
+    Candidate ids are drawn from the cached id range and fetched with a single
+    ``IN`` query per round; ids that fall into gaps are redrawn, and anything
+    still missing after ``MAX_ROUNDS`` is filled by index seeks.
+    """
+    low, high = _id_range(model)
+    if low is None:
+        return []
+
+    found = {}
+    for attempt in range(MAX_ROUNDS):
+        if attempt:
+            low, high = _id_range(model, refresh=(attempt == 1))
+            if low is None:
+                return []
+        pool = [i for i in range(low, high + 1) if i not in found] if high - low < 4 * n else None
+        wanted = 2 * (n - len(found))
+        if pool is not None:
+            candidates = random.sample(pool, min(len(pool), wanted))
+        else:
+            candidates = {random.randint(low, high) for _ in range(wanted)} - found.keys()
+        hits = model.query.filter(model.id.in_(candidates)).all()
+        for row in random.sample(hits, min(len(hits), n - len(found))):
+            found[row.id] = row
+        if len(found) >= n or (pool is not None and len(pool) <= wanted):
+            break
+
+    for _ in range(n - len(found)):
+        row = _seek(model, low, high)
+        if row is None:
+            break
+        found.setdefault(row.id, row)
+    rows = list(found.values())
+    random.shuffle(rows)
+    return rows
+
+
+def sample_size():
+    """Read ``?n=`` from the request, clamped to ``MAX_SAMPLE``; ``None`` if absent."""
+    if "n" not in request.args:
+        return None
+    n = request.args.get("n", type=int)
+    if not n or n < 1:
+        bad_request("n must be a positive integer")
+    return min(n, MAX_SAMPLE)
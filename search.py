@@ -0,0 +1,136 @@
+# search.py
+import re
+
+from sqlalchemy import DDL, event, func, inspect, literal_column, select, text
+
+from database import db
+
+# tablename -> names of the columns covered by its full-text index
+INDEXED_COLUMNS = {}
+
+
+def full_text_index(model, *columns):
+    """
+    Register a full-text index over ``columns`` of ``model``.
+
+    SQLite gets an external-content FTS5 table (``<table>_fts``) kept in sync by
+    triggers; PostgreSQL gets a generated ``search_vector`` tsvector column with
+    a GIN index. Both are created by ``create_search_indexes``.
+    """
+    table = model.__table__
+    INDEXED_COLUMNS[table.name] = list(columns)
+    event.listen(
+        table, "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {table.name}_fts").execute_if(dialect="sqlite"),
+    )
+
+
+def _sqlite_ddl(table, columns):
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', content_rowid='id')",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+              INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+              INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});
+            END""",
+        # Only re-index when an indexed column changes, so bulk status updates stay cheap
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+              INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});
+              INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});
+            END""",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _postgresql_ddl(table, columns):
+    document = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+    return [
+        f"""ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (to_tsvector('english', {document})) STORED""",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)",
+    ]
+
+
+def index_ddl(dialect, table, columns):
+    """
+    Statements that build the full-text index over ``columns`` of ``table``; empty for other dialects.
+
+    The one definition of the indexes: migration 0002 runs them for its own
+    column lists, and ``create_search_indexes`` for the registered ones.
+    """
+    if dialect == "sqlite":
+        return _sqlite_ddl(table, columns)
+    if dialect == "postgresql":
+        return _postgresql_ddl(table, columns)
+    return []
+
+
+def create_search_indexes():
+    """Create any missing full-text indexes; safe to call on every startup."""
+    dialect = db.engine.dialect.name
+    with db.engine.begin() as conn:
+        # Inspect on this transaction's connection: an inspector on the engine checks out a
+        # second one, which waits on the lock this transaction takes while building an index
+        inspector = inspect(conn)
+        for table, columns in INDEXED_COLUMNS.items():
+            if dialect == "sqlite" and inspector.has_table(f"{table}_fts"):
+                continue
+            if dialect == "postgresql" and "search_vector" in {c["name"] for c in inspector.get_columns(table)}:
+                continue
+            for statement in index_ddl(dialect, table, columns):
+                conn.execute(text(statement))
+
+
+def _terms(query):
+    return re.findall(r"\w+", query)
+
+
+def text_search(model, query, *columns):
+    """
+    Build a ranked full-text search over ``columns`` of ``model``.
+
+    Returns ``(query, *sort_keys)`` ready to pass to ``pagination.paginate``;
+    ranks are normalised so that a lower value is a better match. An empty
+    query matches every row, and dialects without an index fall back to ILIKE.
+    """
+    terms = _terms(query)
+    table = model.__tablename__
+    dialect = db.engine.dialect.name
+
+    if not terms:
+        return model.query, model.id
+
+    if dialect == "sqlite" and table in INDEXED_COLUMNS:
+        fts = literal_column(f"{table}_fts")
+        match = " ".join(f'"{term}"*' for term in terms)
+        if len(columns) < len(INDEXED_COLUMNS[table]):
+            match = "{" + " ".join(c.key for c in columns) + "} : (" + match + ")"
+        hits = (
+            select(literal_column("rowid").label("id"), func.bm25(fts).label("score"))
+            .select_from(db.table(f"{table}_fts"))
+            .where(fts.op("MATCH")(match))
+            .subquery()
+        )
+    elif dialect == "postgresql" and table in INDEXED_COLUMNS:
+        tsquery = func.to_tsquery("english", " & ".join(f"{term}:*" for term in terms))
+        vector = literal_column(f"{table}.search_vector")
+        condition = vector.op("@@")(tsquery)
+        if len(columns) < len(INDEXED_COLUMNS[table]):
+            # The GIN index narrows the candidates; recheck only the requested columns
+            document = func.concat_ws(" ", *columns)
+            condition = condition & func.to_tsvector("english", document).op("@@")(tsquery)
+        hits = (
+            select(model.id.label("id"), (-func.ts_rank(vector, tsquery)).label("score"))
+            .where(condition)
+            .subquery()
+        )
+    else:
+        pattern = f"%{query}%"
+        return model.query.filter(db.or_(*[c.ilike(pattern) for c in columns])), model.id
+
+    return model.query.join(hits, hits.c.id == model.id), hits.c.score, model.id
@@ -1,65 +1,162 @@
 # seed.py
 import os
-from faker import Faker
-from app import app, db
+import random
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+
+import aggregates
+from database import db
+from changes import create_change_triggers
+from search import create_search_indexes
 from bookify.models import Book
 from taskflow.models import Task
-from notenest.models import Note
+from notenest.models import Note, count_words
 
-fake = Faker()
+BATCH_SIZE = 5000
 
-def seed_books(n=10):
-    for _ in range(n):
-        book = Book(
-            title=fake.sentence(nb_words=3),
-            author=fake.name(),
-            status=fake.random_element(elements=["Not Read", "Reading", "Completed"])
-        )
-        db.session.add(book)
-    db.session.commit()
-    print(f"✅ Added {n} fake books")
+# Faker is slow per call, so draw a pool of values once and sample from it per row
+_pools = {}
 
 
-def seed_tasks(n=15):
-    for _ in range(n):
-        task = Task(
-            title=fake.sentence(nb_words=4),
-            description=fake.text(max_nb_chars=150),
-            completed=fake.boolean(chance_of_getting_true=30)
-        )
-        db.session.add(task)
-    db.session.commit()
-    print(f"✅ Added {n} fake tasks")
+def _pool(name):
+    if not _pools:
+        from faker import Faker
+        fake = Faker()
+        _pools["words"] = fake.words(nb=2000)
+        _pools["names"] = [fake.name() for _ in range(2000)]
+    return _pools[name]
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choices(_pool("words"), k=n)).capitalize() + "."
 
 
-def seed_notes(n=12):
+def _paragraph(rng, sentences):
+    return " ".join(_sentence(rng, rng.randint(6, 12)) for _ in range(sentences))
+
+
+def _book_rows(rng, n):
+    names = _pool("names")
+    return [{
+        "title": _sentence(rng, 3),
+        "author": rng.choice(names),
+        "status": rng.choice(("Not Read", "Reading", "Completed"))
+    } for _ in range(n)]
+
+
+def _task_rows(rng, n):
+    return [{
+        "title": _sentence(rng, 4),
+        "description": _paragraph(rng, 2)[:250],
+        "completed": rng.random() < 0.3
+    } for _ in range(n)]
+
+
+def _note_rows(rng, n):
+    now = datetime.utcnow()
+    rows = []
     for _ in range(n):
-        note = Note(
-            title=fake.sentence(nb_words=4),
-            content=fake.paragraph(nb_sentences=3)
-        )
-        db.session.add(note)
-    db.session.commit()
-    print(f"✅ Added {n} fake notes")
+        content = _paragraph(rng, 3)
+        rows.append({
+            "title": _sentence(rng, 4),
+            "content": content,
+            "word_count": count_words(content),
+            "created_at": now - timedelta(seconds=rng.randint(0, 60 * 24 * 3600))
+        })
+    return rows
 
 
-if __name__ == "__main__":
-    with app.app_context():
-        print("🌱 Seeding database...")
+GENERATORS = {Book: _book_rows, Task: _task_rows, Note: _note_rows}
+
+
+def _generate(job):
+    """Build one batch of rows; runs in worker processes when ``workers > 1``."""
+    generator, size, seed = job
+    return generator(random.Random(seed), size)
+
+
+def seed_model(model, n, workers=1, batch_size=BATCH_SIZE):
+    """Insert ``n`` generated rows of ``model`` in chunked executemany transactions."""
+    if n <= 0:
+        return
+    jobs = [
+        (GENERATORS[model], min(batch_size, n - start), random.randrange(2**32))
+        for start in range(0, n, batch_size)
+    ]
+    _pool("words")  # build the value pools once so forked workers inherit them
+    started = time.perf_counter()
+    if workers > 1:
+        with Pool(workers) as pool:
+            batches = pool.imap_unordered(_generate, jobs)
+            for rows in batches:
+                db.session.execute(insert(model), rows)
+                db.session.commit()
+    else:
+        for job in jobs:
+            db.session.execute(insert(model), _generate(job))
+            db.session.commit()
+
+    aggregates.refresh(model)
+    db.session.commit()
+    elapsed = time.perf_counter() - started
+    print(f"✅ Added {n} fake {model.__tablename__} in {elapsed:.1f}s ({n / elapsed:,.0f} rows/sec)")
 
-        # ⚠️ Only drop tables in local dev, not in Render
-        if os.environ.get("RENDER") == "true":
-            print("⚠️ Running in Render environment — skipping db.drop_all() to protect production data.")
-        else:
-            db.drop_all()
-            print("🧹 Dropped all tables (local environment).")
 
-        # ✅ Ensure tables exist
+def reset_database():
+    # ⚠️ Only drop tables in local dev, not in Render
+    if os.environ.get("RENDER") == "true":
+        print("⚠️ Running in Render environment — skipping db.drop_all() to protect production data.")
         db.create_all()
+        return False
+    db.drop_all()
+    print("🧹 Dropped all tables (local environment).")
+    db.create_all()
+    from flask_migrate import stamp
+    stamp()  # the fresh schema already matches the latest migration
+    return True
+
+
+@click.command("seed")
+@click.option("--books", default=10, show_default=True, help="Number of books to generate.")
+@click.option("--tasks", default=15, show_default=True, help="Number of tasks to generate.")
+@click.option("--notes", default=12, show_default=True, help="Number of notes to generate.")
+@click.option("--workers", default=1, show_default=True, help="Processes generating rows in parallel.")
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True, help="Rows per insert transaction.")
+@click.option("--reset/--no-reset", default=True, show_default=True, help="Drop and recreate tables first.")
+@with_appcontext
+def seed_command(books, tasks, notes, workers, batch_size, reset):
+    """Fill the database with fake books, tasks and notes."""
+    print("🌱 Seeding database...")
+    # On a fresh schema the search indexes are built once after loading,
+    # instead of being maintained row by row by triggers
+    fresh = reset_database() if reset else False
+    if not fresh:
+        create_search_indexes()
+        create_change_triggers()
+
+    seed_model(Book, books, workers, batch_size)
+    seed_model(Task, tasks, workers, batch_size)
+    seed_model(Note, notes, workers, batch_size)
 
-        # ✅ Add fake data
-        seed_books()
-        seed_tasks()
-        seed_notes()
+    if fresh:
+        started = time.perf_counter()
+        create_search_indexes()
+        print(f"🔍 Built search indexes in {time.perf_counter() - started:.1f}s")
+        # A fresh table's rows are its starting point, not changes to replay
+        create_change_triggers()
+    print("🌳 Done seeding!")
 
-        print("🌳 Done seeding!")
+
+if __name__ == "__main__":
+    from app import create_app
+    from database import init_migrate
+    app = create_app()
+    # Outside the flask command create_app skips Flask-Migrate, which reset_database stamps with
+    init_migrate(app)
+    with app.app_context():
+        seed_command.main(standalone_mode=False)
@@ -1,12 +1,21 @@
+from datetime import datetime
+from sqlalchemy import func, case
 from database import db
+from search import full_text_index
+from changes import change_feed
 
 class Task(db.Model):
     __tablename__ = 'tasks'
+    # The keys of to_dict(), selected as plain columns by list and export routes
+    FIELDS = ("id", "title", "description", "completed")
+    # What list routes return unless ?fields= asks for more
+    LIST_FIELDS = ("id", "title", "completed")
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(120), nullable=False)
     description = db.Column(db.String(250))
     completed = db.Column(db.Boolean, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def to_dict(self):
         return {
@@ -15,3 +24,24 @@ class Task(db.Model):
             "description": self.description,
             "completed": self.completed
         }
+
+    @staticmethod
+    def counts(row):
+        """Counter deltas contributed by one task (see aggregates.py)."""
+        return {"total": 1, "completed": int(bool(row['completed']))}
+
+    @classmethod
+    def recount(cls):
+        """Recompute the task counters with a single conditional-sum query."""
+        total, completed = db.session.query(
+            func.count(cls.id),
+            func.coalesce(func.sum(case((cls.completed == True, 1), else_=0)), 0)  # noqa: E712
+        ).one()
+        return {"total": total, "completed": completed}
+
+
+full_text_index(Task, "title", "description")
+change_feed(Task)
+
+# Mirrored by migrations/versions/0003_hot_filter_indexes.py
+db.Index("ix_tasks_completed_id", Task.completed, Task.id)
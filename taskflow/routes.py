@@ -1,7 +1,18 @@
 from flask import Blueprint, request, jsonify
 from .models import db, Task
 from sqlalchemy import func
-import random
+from pagination import paginate_records
+from streaming import stream_export
+from importer import import_rows
+from search import text_search
+from sampling import random_rows, sample_size
+import aggregates
+from cache import row_cache
+from conditional import conditional
+from admission import cost, long_lived
+import batch
+import changes
+import jobs
 from datetime import datetime, timedelta
 
 taskflow_bp = Blueprint('taskflow', __name__)
@@ -12,41 +23,63 @@ def home():
         "message": "Welcome to TaskFlow API ✅",
         "endpoints": [
             "/tasks (GET, POST)",
-            "/tasks/<id> (GET, PUT, DELETE)"
+            "/tasks/<id> (GET, PUT, DELETE)",
+            "/changes (GET, text/event-stream)"
         ]
     })
 
 
+def _task_fields(data, partial=False):
+    """Validate a task payload; returns ``(fields, error)``."""
+    if 'completed' in data and not isinstance(data['completed'], bool):
+        return None, "Completed must be true or false"
+    if partial:
+        if 'title' in data and not data['title']:
+            return None, "Title cannot be empty"
+        return {key: data[key] for key in ('title', 'description', 'completed') if key in data}, None
+    if not data.get('title'):
+        return None, "Title is required"
+    return {
+        "title": data['title'],
+        "description": data.get('description', ''),
+        "completed": data.get('completed', False)
+    }, None
+
+
 # --- CREATE ---
 @taskflow_bp.route('/tasks', methods=['POST'])
 def create_task():
     data = request.get_json()
-    title = data.get('title')
-    description = data.get('description', '')
+    fields, error = _task_fields({key: data[key] for key in ('title', 'description') if key in data})
+    if error:
+        return jsonify({"error": error}), 400
 
-    if not title:
-        return jsonify({"error": "Title is required"}), 400
-
-    new_task = Task(title=title, description=description)
+    new_task = Task(title=fields['title'], description=fields['description'])
     db.session.add(new_task)
+    aggregates.track(Task, after=aggregates.snapshot(new_task))
     db.session.commit()
     return jsonify(new_task.to_dict()), 201
 
 
 # --- READ ALL ---
 @taskflow_bp.route('/tasks', methods=['GET'])
+@conditional(Task)
 def get_tasks():
-    tasks = Task.query.all()
-    return jsonify([task.to_dict() for task in tasks])
+    tasks, next_cursor = paginate_records(Task, Task.query, Task.id)
+    return jsonify({
+        "tasks": tasks,
+        "next_cursor": next_cursor
+    })
 
 
 # --- READ ONE ---
 @taskflow_bp.route('/tasks/<int:task_id>', methods=['GET'])
+@conditional()
 def get_task(task_id):
-    task = Task.query.get(task_id)
-    if not task:
+    payload = row_cache.fetch(Task, task_id)
+    if payload is None:
         return jsonify({"error": "Task not found"}), 404
-    return jsonify(task.to_dict())
+    return jsonify(payload)
 
 
 # --- UPDATE ---
@@ -57,10 +90,13 @@ def update_task(task_id):
         return jsonify({"error": "Task not found"}), 404
 
     data = request.get_json()
+    before = aggregates.snapshot(task)
     task.title = data.get('title', task.title)
     task.description = data.get('description', task.description)
     task.completed = data.get('completed', task.completed)
+    aggregates.track(Task, before, aggregates.snapshot(task))
     db.session.commit()
+    row_cache.invalidate(Task, task_id)
 
     return jsonify(task.to_dict())
 
@@ -72,32 +108,64 @@ def delete_task(task_id):
     if not task:
         return jsonify({"error": "Task not found"}), 404
 
+    aggregates.track(Task, before=aggregates.snapshot(task))
     db.session.delete(task)
     db.session.commit()
+    row_cache.invalidate(Task, task_id)
     return jsonify({"message": f"Task {task_id} deleted successfully"})
 
-# --- 1. Search tasks by title or description ---
+# --- BATCH CREATE / UPDATE / DELETE ---
+@taskflow_bp.route('/tasks/batch', methods=['POST'])
+@cost(5)
+def create_tasks_batch():
+    return batch.create(Task, request.get_json(), _task_fields)
+
+
+@taskflow_bp.route('/tasks/batch', methods=['PATCH'])
+@cost(5)
+def update_tasks_batch():
+    return batch.update_many(Task, request.get_json(), _task_fields)
+
+
+@taskflow_bp.route('/tasks/batch', methods=['DELETE'])
+@cost(5)
+def delete_tasks_batch():
+    return batch.delete_many(Task, request.get_json())
+
+
+# --- 1. Search tasks by title or description (full-text, ranked) ---
 @taskflow_bp.route('/tasks/search')
+@cost(2)
+@conditional(Task)
 def search_tasks():
     query = request.args.get('q', '')
-    results = Task.query.filter(
-        (Task.title.ilike(f"%{query}%")) | (Task.description.ilike(f"%{query}%"))
-    ).all()
-    return jsonify([task.to_dict() for task in results])
+    results, next_cursor = paginate_records(Task, *text_search(Task, query, Task.title, Task.description))
+    return jsonify({
+        "tasks": results,
+        "next_cursor": next_cursor
+    })
 
 
 # --- 2. Get all completed tasks ---
 @taskflow_bp.route('/tasks/completed')
+@conditional(Task)
 def completed_tasks():
-    tasks = Task.query.filter_by(completed=True).all()
-    return jsonify([task.to_dict() for task in tasks])
+    tasks, next_cursor = paginate_records(Task, Task.query.filter_by(completed=True), Task.id)
+    return jsonify({
+        "tasks": tasks,
+        "next_cursor": next_cursor
+    })
 
 
 # --- 3. Get all incomplete tasks ---
 @taskflow_bp.route('/tasks/pending')
+@conditional(Task)
 def pending_tasks():
-    tasks = Task.query.filter_by(completed=False).all()
-    return jsonify([task.to_dict() for task in tasks])
+    tasks, next_cursor = paginate_records(Task, Task.query.filter_by(completed=False), Task.id)
+    return jsonify({
+        "tasks": tasks,
+        "next_cursor": next_cursor
+    })
 
 
 # --- 4. Toggle task completion ---
@@ -107,35 +175,49 @@ def toggle_task(task_id):
     if not task:
         return jsonify({"error": "Task not found"}), 404
 
+    before = aggregates.snapshot(task)
     task.completed = not task.completed
+    aggregates.track(Task, before, aggregates.snapshot(task))
     db.session.commit()
+    row_cache.invalidate(Task, task_id)
     return jsonify({
         "message": f"Task {task.id} marked as {'completed' if task.completed else 'incomplete'}",
         "task": task.to_dict()
     })
 
 
-# --- 5. Delete all completed tasks ---
+# Table-wide changes run as chunked background jobs (see jobs.py)
+jobs.register("taskflow.clear_completed", Task, where=lambda p: Task.completed == True)  # noqa: E712
+jobs.register("taskflow.set_completed", Task, values=lambda p: {"completed": p['completed']})
+
+
+# --- 5. Delete all completed tasks (202 + job) ---
 @taskflow_bp.route('/tasks/clear_completed', methods=['DELETE'])
+@cost(5)
 def clear_completed_tasks():
-    deleted = Task.query.filter_by(completed=True).delete()
-    db.session.commit()
-    return jsonify({"message": f"{deleted} completed tasks deleted"})
+    return jobs.enqueue("taskflow.clear_completed")
 
-# --- 6. Get a random task ---
+# --- 6. Get a random task (or ?n= random tasks) ---
 @taskflow_bp.route('/tasks/random')
+@cost(5)
 def random_task():
-    tasks = Task.query.all()
+    n = sample_size()
+    tasks = random_rows(Task, n or 1)
     if not tasks:
         return jsonify({"message": "No tasks found"}), 404
-    return jsonify(random.choice(tasks).to_dict())
+    if n is not None:
+        return jsonify({"tasks": [task.to_dict() for task in tasks]})
+    return jsonify(tasks[0].to_dict())
 
 
 # --- 7. Get task statistics ---
 @taskflow_bp.route('/tasks/stats')
+@cost(2)
+@conditional(Task)
 def task_stats():
-    total = Task.query.count()
-    completed = Task.query.filter_by(completed=True).count()
+    counts = aggregates.totals(Task)
+    total = counts.get("total", 0)
+    completed = counts.get("completed", 0)
     pending = total - completed
     return jsonify({
         "total_tasks": total,
@@ -147,27 +229,42 @@ def task_stats():
 
 # --- 8. Get tasks created recently (within X days) ---
 @taskflow_bp.route('/tasks/recent')
+@conditional(Task)
 def recent_tasks():
     days = int(request.args.get('days', 7))
     cutoff = datetime.utcnow() - timedelta(days=days)
-    tasks = Task.query.filter(Task.id >= 1).order_by(Task.id.desc()).limit(10).all()  # Simulated
-    return jsonify([task.to_dict() for task in tasks])
+    tasks, next_cursor = paginate_records(Task, Task.query, Task.id, descending=True)  # Simulated: newest ids first
+    return jsonify({
+        "tasks": tasks,
+        "next_cursor": next_cursor
+    })
 
 
-# --- 9. Bulk toggle all tasks (mark all done or undone) ---
+# --- 9. Bulk toggle all tasks, done or undone (202 + job) ---
 @taskflow_bp.route('/tasks/toggle_all', methods=['PUT'])
+@cost(5)
 def toggle_all_tasks():
     flag = request.args.get('completed', 'true').lower() == 'true'
-    updated = Task.query.update({Task.completed: flag})
-    db.session.commit()
-    return jsonify({"message": f"{updated} tasks marked as {'completed' if flag else 'pending'}"})
+    return jobs.enqueue("taskflow.set_completed", {"completed": flag})
 
 
 # --- 10. Export all tasks as JSON ---
 @taskflow_bp.route('/tasks/export')
+@cost(20)
+@conditional(Task)
 def export_tasks():
-    tasks = Task.query.all()
-    return jsonify({
-        "exported_count": len(tasks),
-        "tasks": [task.to_dict() for task in tasks]
-    })
+    return stream_export(Task.query.order_by(Task.id), "tasks")
+
+
+# --- 11. Import tasks from NDJSON or CSV (counterpart to export) ---
+@taskflow_bp.route('/tasks/import', methods=['POST'])
+@cost(20)
+def import_tasks():
+    return import_rows(Task, _task_fields)
+
+
+# --- 12. Live feed of task changes (Server-Sent Events), resumable with Last-Event-ID or ?since= ---
+@taskflow_bp.route('/changes')
+@long_lived
+def task_changes():
+    return changes.stream(Task)